@@ -0,0 +1,276 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_abi import encode
+from web3 import EthereumTesterProvider, Web3
+
+# eth-tester wants python values in the tx objects of these calls, web3 sends them hex encoded
+CALL_METHODS = ("eth_call", "eth_estimateGas")
+CALL_FIELDS = {
+    "gasPrice": "gas_price",
+    "maxFeePerGas": "max_fee_per_gas",
+    "maxPriorityFeePerGas": "max_priority_fee_per_gas",
+}
+CALL_INTS = ("gas", "gas_price", "max_fee_per_gas", "max_priority_fee_per_gas", "value", "nonce")
+
+# Opcodes used by the hand assembled stand-ins
+OPCODES = {
+    "ADD": 0x01, "MUL": 0x02, "SUB": 0x03, "DIV": 0x04, "LT": 0x10, "ISZERO": 0x15, "POP": 0x50,
+    "MLOAD": 0x51, "MSTORE": 0x52, "JUMP": 0x56, "JUMPI": 0x57, "GAS": 0x5A, "JUMPDEST": 0x5B,
+    "DUP1": 0x80, "DUP3": 0x82, "DUP7": 0x86, "SWAP1": 0x90, "CALLDATALOAD": 0x35, "CALLDATACOPY": 0x37,
+    "RETURNDATASIZE": 0x3D, "RETURNDATACOPY": 0x3E, "CALL": 0xF1, "RETURN": 0xF3,
+}
+
+
+def get_selector(signature):
+    return bytes(Web3.keccak(text=signature)[:4])
+
+
+def get_responder_code(responses):
+    """
+    Deploy code of a stand-in contract that answers a call with the fixed bytes in `responses`
+    ({function signature: abi encoded return}) and any other call, payable or not, with 32 zero bytes.
+    """
+    responses = [(get_selector(signature), data) for signature, data in responses.items()]
+
+    header = bytes.fromhex("600035" "60e01c")  # selector = calldataload(0) >> 224
+    default = bytes.fromhex("6020" "6000" "f3")  # return 32 zero bytes
+    dispatch_size, target_size = 11, 16
+
+    targets_at = len(header) + dispatch_size * len(responses) + len(default)
+    data_at = targets_at + target_size * len(responses)
+
+    dispatch, targets, blobs = b"", b"", b""
+    for selector, data in responses:
+        target = targets_at + len(targets)
+        offset = data_at + len(blobs)
+
+        # if selector == ...: jump to target
+        dispatch += b"\x80\x63" + selector + b"\x14\x61" + target.to_bytes(2, "big") + b"\x57"
+        # codecopy(0, offset, size), return(0, size)
+        size = len(data).to_bytes(2, "big")
+        targets += b"\x5b\x61" + size + b"\x61" + offset.to_bytes(2, "big") + b"\x60\x00\x39"
+        targets += b"\x61" + size + b"\x60\x00\xf3"
+        blobs += data
+
+    return get_deploy_code(header + dispatch + default + targets + blobs)
+
+
+def get_deploy_code(runtime):
+    """Constructor that deploys `runtime`: codecopy(0, 15, size), return(0, size)"""
+    size = len(runtime).to_bytes(2, "big")
+    init = b"\x61" + size + b"\x61\x00\x0f\x60\x00\x39\x61" + size + b"\x60\x00\xf3"
+    return init + runtime
+
+
+def assemble(program):
+    """
+    Bytecode of a list of opcode names, ints (pushed as PUSH2), "@label" (a jumpdest) and
+    ">label" (pushes the label's offset)
+    """
+    code, labels, jumps = b"", {}, []
+    for item in program:
+        if isinstance(item, int):
+            code += b"\x61" + item.to_bytes(2, "big")
+        elif item.startswith("@"):
+            labels[item[1:]] = len(code)
+            code += bytes([OPCODES["JUMPDEST"]])
+        elif item.startswith(">"):
+            jumps.append((len(code) + 1, item[1:]))
+            code += b"\x61\x00\x00"
+        else:
+            code += bytes([OPCODES[item]])
+
+    code = bytearray(code)
+    for at, label in jumps:
+        code[at : at + 2] = labels[label].to_bytes(2, "big")
+    return bytes(code)
+
+
+def get_multicall_code():
+    """
+    Deploy code of a Multicall3 stand-in that only knows aggregate3: every call is made, failed ones
+    come back with success false whatever their allowFailure. Variables live in the first 4 memory
+    words, the (bool, bytes)[] result is built from 0x80 on.
+    """
+    i, n, p, base, out = 0x00, 0x20, 0x40, 0x60, 0x80
+    heads = out + 0x40  # Offsets of the results, relative to here
+
+    runtime = assemble(
+        [
+            # base = start of the call offsets, n = number of calls
+            4, "CALLDATALOAD", 36, "ADD", base, "MSTORE",
+            32, base, "MLOAD", "SUB", "CALLDATALOAD", n, "MSTORE",
+            # Result head: offset of the array, its length, p = first free byte after the offsets
+            0x20, out, "MSTORE",
+            n, "MLOAD", out + 0x20, "MSTORE",
+            n, "MLOAD", 32, "MUL", heads, "ADD", p, "MSTORE",
+            "@loop",
+            n, "MLOAD", i, "MLOAD", "LT", "ISZERO", ">end", "JUMPI",
+            # tuple = base + offset of call i
+            i, "MLOAD", 32, "MUL", base, "MLOAD", "ADD", "CALLDATALOAD", base, "MLOAD", "ADD",
+            # Offset of result i
+            heads, p, "MLOAD", "SUB", i, "MLOAD", 32, "MUL", heads, "ADD", "MSTORE",
+            # [target, callData start]
+            "DUP1", "CALLDATALOAD", "SWAP1", "DUP1", 64, "ADD", "CALLDATALOAD", "ADD",
+            # Copy callData to p + 96, [target, size]
+            "DUP1", "CALLDATALOAD", "DUP1", "DUP3", 32, "ADD", p, "MLOAD", 96, "ADD", "CALLDATACOPY",
+            "SWAP1", "POP",
+            # success = call(gas, target, 0, p + 96, size, 0, 0)
+            0, 0, "DUP3", p, "MLOAD", 96, "ADD", 0, "DUP7", "GAS", "CALL",
+            p, "MLOAD", "MSTORE", "POP", "POP",
+            # (success, returnData) at p, the data zero padded to 32 bytes
+            0x40, p, "MLOAD", 32, "ADD", "MSTORE",
+            "RETURNDATASIZE", p, "MLOAD", 64, "ADD", "MSTORE",
+            "RETURNDATASIZE", 0, p, "MLOAD", 96, "ADD", "RETURNDATACOPY",
+            0, "RETURNDATASIZE", p, "MLOAD", 96, "ADD", "ADD", "MSTORE",
+            31, "RETURNDATASIZE", "ADD", 32, "SWAP1", "DIV", 32, "MUL", p, "MLOAD", "ADD", 96, "ADD", p, "MSTORE",
+            i, "MLOAD", 1, "ADD", i, "MSTORE",
+            ">loop", "JUMP",
+            "@end",
+            out, p, "MLOAD", "SUB", out, "RETURN",
+        ]
+    )
+    return get_deploy_code(runtime)
+
+
+def get_token_code(symbol, balance):
+    """Stand-in ERC-20: every address holds `balance`, nothing is approved, transfers and approvals succeed"""
+    return get_responder_code(
+        {
+            "balanceOf(address)": encode(["uint256"], [balance]),
+            "decimals()": encode(["uint8"], [18]),
+            "symbol()": encode(["string"], [symbol]),
+            "approve(address,uint256)": encode(["bool"], [True]),
+            "transfer(address,uint256)": encode(["bool"], [True]),
+        }
+    )
+
+
+def to_json(value):
+    """eth-tester results to JSON-RPC values: ints and bytes as hex, snake_case keys as camelCase"""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, dict):
+        return {to_camel_case(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    return value
+
+
+def to_camel_case(key):
+    head, *rest = key.split("_")
+    return head + "".join(part.title() for part in rest)
+
+
+class DevChainServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections are not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class DevChainHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        if isinstance(body, list):
+            result = [self.server.chain.handle(request) for request in body]
+        else:
+            result = self.server.chain.handle(body)
+
+        data = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DevChain:
+    """
+    In-process EVM (eth-tester on py-evm) behind a JSON-RPC HTTP endpoint on localhost.
+
+    Every tx is mined in its own block right away. Requests are served one at a time,
+    py-evm is not thread safe.
+    """
+
+    def __init__(self, port=0):
+        self.provider = EthereumTesterProvider()
+        self.web3 = Web3(self.provider)
+        self.lock = threading.Lock()
+        self.server = DevChainServer(("127.0.0.1", port), DevChainHandler)
+        self.server.chain = self
+
+        self.faucet = self.web3.eth.accounts[0]
+        self.chain_id = self.web3.eth.chain_id
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="devchain", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def handle(self, request):
+        method, params = request["method"], list(request.get("params", []))
+
+        if method in CALL_METHODS and params and isinstance(params[0], dict):
+            params[0] = self.parse_call(params[0])
+        if method == "eth_getBlockByNumber" and str(params[0]).startswith("0x"):
+            params[0] = int(params[0], 16)
+
+        try:
+            with self.lock:
+                response = self.provider.make_request(method, params)
+        except Exception as error:
+            response = {"error": str(error)}
+
+        if "error" in response:
+            error = response["error"]
+            if not isinstance(error, dict):
+                error = {"code": -32000, "message": str(error)}
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": error}
+
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": to_json(response.get("result"))}
+
+    def parse_call(self, call):
+        parsed = {"from": self.faucet}  # eth-tester refuses calls without a sender
+        for key, value in call.items():
+            if key == "chainId":
+                continue
+
+            key = CALL_FIELDS.get(key, key)
+            if key in CALL_INTS and isinstance(value, str):
+                value = int(value, 16)
+            parsed[key] = value
+        return parsed
+
+    def deploy(self, code):
+        with self.lock:
+            tx_hash = self.web3.eth.send_transaction({"from": self.faucet, "data": code})
+            return self.web3.eth.get_transaction_receipt(tx_hash)["contractAddress"]
+
+    def fund(self, keys, value):
+        """Sends `value` to the wallets and imports their keys, eth-tester only simulates calls of senders it holds"""
+        with self.lock:
+            for key in keys:
+                address = self.provider.ethereum_tester.add_account(key)
+                self.web3.eth.send_transaction({"from": self.faucet, "to": address, "value": value})
@@ -0,0 +1,292 @@
+"""
+End-to-end throughput of the wallet actions against a local dev chain and a mock Bitlayer API.
+
+    python -m benchmarks.e2e --wallets 10 100 1000 --concurrency 20
+    python -m benchmarks.e2e --actions "Claim Daily Tasks" "Deposit to Avalon" --json reports/e2e.json
+    python -m benchmarks.e2e --wallets 100 --latency 80 --latency-p99 600 --rate-limit-rate 0.02 --session-ttl 30
+
+Contracts are stand-ins deployed on an in-process EVM at the addresses of modules.config, the Bitlayer API
+is served by `MockBitlayerApi` with the latency and faults given on the command line. Sleeps between wallets
+and actions are turned off, every other setting is taken from settings.py. Every wallet count gets its own
+set of funded wallets.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+from rich.console import Console
+from rich.table import Table
+from web3 import Web3
+
+import settings
+from benchmarks.devchain import DevChain, get_multicall_code, get_responder_code, get_token_code
+from benchmarks.mock_api import MockBitlayerApi, get_conditions
+from modules import config
+
+# Actions that stay on Bitlayer, the bridges and the airdrop claim need other chains
+ACTIONS = [
+    "🏆 Check Airdrop",
+    "Free Draw",
+    "Claim Daily Tasks",
+    "Claim Total TXN",
+    "Open Treasure Box",
+    "Assemble Car",
+    f"Wrap BTC {settings.WRAP_TX_COUNT[0]} to {settings.WRAP_TX_COUNT[1]} times",
+    "Unwrap WBTC",
+    "Swap BTC > WBTC > BTC",
+    "Swap BTC > BITUSD > WBTC",
+    "Check in with Owlto",
+    "Deposit to Avalon",
+    "Deposit to LayerBank",
+]
+
+TOKEN_BALANCE = 10**15
+WALLET_BALANCE = 10**18
+
+
+def get_stand_ins():
+    """{modules.config name: deploy code} of the contracts the actions talk to"""
+    tokens = {"WBTC": "WBTC", "BITUSD": "BITUSD", "BTR": "BTR"}
+    contracts = ["BITCOW", "AVALON", "LAYERBANK", "OWLTO"]
+    contracts += ["BITLAYER_LOTTERY", "BITLAYER_CHECK_IN", "BITLAYER_MINING_GALA", "BITLAYER_AIRDROP"]
+
+    stand_ins = {name: get_token_code(symbol, TOKEN_BALANCE) for name, symbol in tokens.items()}
+    stand_ins.update({name: get_responder_code({}) for name in contracts})
+    return stand_ins
+
+
+def get_keys(start, count):
+    """Deterministic private keys, wallet `start` to `start + count`"""
+    return [Web3.keccak(text=f"bitlayer-benchmark-{index}").hex() for index in range(start, start + count)]
+
+
+def get_percentile(values, percent):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def get_total(counter, **labels):
+    """Sum of a metrics counter over the series matching `labels`"""
+    with counter.lock:
+        return sum(
+            value
+            for values, value in counter.values.items()
+            if all(dict(zip(counter.labels, values))[label] == wanted for label, wanted in labels.items())
+        )
+
+
+class BenchmarkRun:
+    """Takes the outcome of every wallet in place of a `Run` of the journal"""
+
+    def __init__(self):
+        self.failed = 0
+
+    def record(self, key, status):
+        if status == "failed":
+            self.failed += 1
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.errors = 0
+        self.results = []
+        self.loop = asyncio.new_event_loop() if settings.ASYNC_MODE else None
+
+    def setup(self):
+        """Starts the dev chain and the mock API and points modules.config at them, before any module is imported"""
+        workdir = tempfile.mkdtemp(prefix="bitlayer-benchmark-")
+        config.CACHE_DIR = os.path.join(workdir, "cache")
+
+        self.chain = DevChain(self.args.chain_port).start()
+        for name, code in get_stand_ins().items():
+            setattr(config, name, self.chain.deploy(code))
+
+        config.CHAIN_DATA["bitlayer"]["rpc"] = self.chain.url
+        config.CHAIN_DATA["bitlayer"]["chain_id"] = self.chain.chain_id
+        config.CHAIN_DATA["bitlayer"]["multicall"] = self.chain.deploy(get_multicall_code())
+
+        self.api = MockBitlayerApi(self.args.api_port, get_conditions(self.args)).start()
+        config.BITLAYER_API = self.api.url
+
+        settings.USE_PROXY = False
+        settings.SLEEP_BETWEEN_WALLETS = [0, 0]
+        settings.SLEEP_BETWEEN_ACTIONS = [0, 0]
+        settings.EXIT_IP_TTL = float("inf")
+        settings.METRICS_FILE = ""
+
+        from models import report_writer
+        from models.proxy_pool import save_exit_ip
+
+        report_writer.REPORTS_DIR = os.path.join(workdir, "reports")
+        save_exit_ip(None, "127.0.0.1")  # No httpbin lookups on login
+
+        config.logger.remove()
+        config.logger.add(sys.stderr, level="INFO" if self.args.verbose else "WARNING", format="{message}")
+        config.logger.add(self.count_error, level="ERROR", format="{message}")
+
+        if self.loop:
+            from models.provider import open_async_sessions
+
+            self.loop.run_until_complete(open_async_sessions())
+
+    def count_error(self, message):
+        self.errors += 1
+
+    def get_handler(self, keys):
+        from modules.actions import ActionHandler
+        from modules.async_actions import AsyncActionHandler
+
+        handler_class = AsyncActionHandler if self.loop else ActionHandler
+        return handler_class(keys, [], [])
+
+    def run(self):
+        self.setup()
+
+        start = 0
+        for count in self.args.wallets:
+            keys = get_keys(start, count)
+            start += count
+
+            self.chain.fund(keys, WALLET_BALANCE)
+            handler = self.get_handler(keys)
+
+            for action in self.args.actions:
+                self.results.append(self.run_action(handler, action, keys))
+                self.print_result(self.results[-1])
+
+        self.print_results()
+        if self.args.json:
+            with open(self.args.json, "w") as file:
+                json.dump(self.results, file, indent=2)
+
+    def run_action(self, handler, action, keys):
+        from main import run_wallets, run_wallets_async
+        from models.metrics import API_REQUESTS, HTTP_RETRIES, RPC_REQUESTS
+
+        self.api.reset()
+        callback = handler.get_action_map()[action]
+        wallets = list(enumerate(keys, start=1))
+        durations = []
+        run = BenchmarkRun()
+
+        rpc_calls = get_total(RPC_REQUESTS, chain="bitlayer")
+        api_calls = get_total(API_REQUESTS)
+        retries = get_total(HTTP_RETRIES)
+        errors = self.errors
+        started_at = time.perf_counter()
+
+        if self.loop:
+
+            async def timed(*args):
+                wallet_started_at = time.perf_counter()
+                try:
+                    return await callback(*args)
+                finally:
+                    durations.append(time.perf_counter() - wallet_started_at)
+
+            self.loop.run_until_complete(run_wallets_async(wallets, len(keys), timed, [], handler, run))
+
+        else:
+
+            def timed(*args):
+                wallet_started_at = time.perf_counter()
+                try:
+                    return callback(*args)
+                finally:
+                    durations.append(time.perf_counter() - wallet_started_at)
+
+            run_wallets(wallets, len(keys), timed, [], handler, run)
+
+        elapsed = time.perf_counter() - started_at
+
+        return {
+            "action": action,
+            "wallets": len(keys),
+            "concurrency": settings.MAX_CONCURRENT_WALLETS,
+            "async": settings.ASYNC_MODE,
+            "seconds": round(elapsed, 3),
+            "wallets_per_minute": round(len(keys) / elapsed * 60, 2),
+            "rpc_calls_per_wallet": round((get_total(RPC_REQUESTS, chain="bitlayer") - rpc_calls) / len(keys), 2),
+            "api_calls_per_wallet": round((get_total(API_REQUESTS) - api_calls) / len(keys), 2),
+            "retries_per_wallet": round((get_total(HTTP_RETRIES) - retries) / len(keys), 2),
+            "p50": round(get_percentile(durations, 50), 3),
+            "p99": round(get_percentile(durations, 99), 3),
+            "failed": run.failed,
+            "errors": self.errors - errors,
+        }
+
+    @staticmethod
+    def print_result(result):
+        print(
+            f"{result['action']} x{result['wallets']}: {result['wallets_per_minute']} wallets/min, "
+            f"{result['rpc_calls_per_wallet']} RPC calls/wallet, p50 {result['p50']}s, p99 {result['p99']}s"
+        )
+
+    def print_results(self):
+        table = Table(title="End-to-end benchmark")
+        columns = ["Action", "Wallets", "Wallets/min", "RPC/wallet", "API/wallet", "Retries/wallet", "p50 s", "p99 s"]
+        columns.append("Errors")
+        for column in columns:
+            table.add_column(column, justify="left" if column == "Action" else "right", no_wrap=True)
+
+        for result in self.results:
+            table.add_row(
+                result["action"],
+                str(result["wallets"]),
+                f"{result['wallets_per_minute']:.1f}",
+                f"{result['rpc_calls_per_wallet']:.1f}",
+                f"{result['api_calls_per_wallet']:.1f}",
+                f"{result['retries_per_wallet']:.2f}",
+                f"{result['p50']:.2f}",
+                f"{result['p99']:.2f}",
+                str(result["failed"] + result["errors"]),
+            )
+
+        Console(width=130).print(table)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end throughput of the wallet actions")
+    parser.add_argument("--wallets", type=int, nargs="+", default=[10, 100, 1000], help="Wallet counts to run")
+    parser.add_argument("--actions", nargs="+", default=ACTIONS, choices=ACTIONS, metavar="ACTION")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.MAX_CONCURRENT_WALLETS,
+        help="MAX_CONCURRENT_WALLETS for the run",
+    )
+    parser.add_argument("--async", dest="async_mode", action="store_true", help="Run with ASYNC_MODE")
+    parser.add_argument("--chain-port", type=int, default=0, help="Port of the dev chain, 0 = any free one")
+    parser.add_argument("--api-port", type=int, default=0, help="Port of the mock API, 0 = any free one")
+    parser.add_argument("--latency", type=float, default=0, help="Median API latency, ms")
+    parser.add_argument("--latency-p99", type=float, help="p99 API latency, ms")
+    parser.add_argument("--rate-limit-rate", type=float, default=0, help="Share of API requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of API requests answered with a 5xx")
+    parser.add_argument("--session-ttl", type=float, default=0, help="Seconds until an API session expires, 0 = never")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of the 429 responses, seconds")
+    parser.add_argument("--seed", type=int, help="Seed of the injected latency and faults")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the info logs of the wallets")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    settings.MAX_CONCURRENT_WALLETS = args.concurrency
+    settings.ASYNC_MODE = settings.ASYNC_MODE or args.async_mode
+
+    Benchmark(args).run()
+
+
+if __name__ == "__main__":
+    main()
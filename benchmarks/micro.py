@@ -0,0 +1,183 @@
+"""
+CPU cost of the per-wallet hot paths: key decoding, module construction, ABI encoding, tx building and signing.
+
+    python -m benchmarks.micro                   # compare with benchmarks/baseline.json
+    python -m benchmarks.micro --save            # record a new baseline
+    python -m benchmarks.micro --threshold 0.5   # flag only cases more than 50% slower
+
+Runs offline: the bitlayer chain is served by `StubProvider`, which answers every JSON-RPC method
+with a fixed value. Exits with 1 when a case is slower than its baseline by more than the threshold.
+Baselines are only comparable on the same machine and Python, re-save them after changing either.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+
+from eth_account import Account
+from rich.console import Console
+from rich.table import Table
+from web3.providers import BaseProvider
+
+from modules import config
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+PRIVATE_KEY = "0x" + "11" * 32
+POOL = "0xDFA33A77ce4420bf4cA7bFa9c1a57A40307a092e"
+
+
+class StubProvider(BaseProvider):
+    """Answers the JSON-RPC methods of tx building with fixed values, without any I/O"""
+
+    RESULTS = {
+        "eth_chainId": hex(200901),
+        "eth_blockNumber": "0x100",
+        "eth_getTransactionCount": "0x0",
+        "eth_getBalance": hex(10**18),
+        "eth_gasPrice": "0x3b9aca00",
+        "eth_maxPriorityFeePerGas": "0x5f5e100",
+        "eth_estimateGas": "0x186a0",
+        "eth_getCode": "0x",
+        "eth_call": "0x" + "00" * 32,
+        "eth_feeHistory": {
+            "oldestBlock": "0xfc",
+            "baseFeePerGas": ["0x3b9aca00"] * 6,
+            "gasUsedRatio": [0.5] * 5,
+            "reward": [["0x5f5e100"]] * 5,
+        },
+    }
+
+    def make_request(self, method, params):
+        return {"jsonrpc": "2.0", "id": 1, "result": self.RESULTS[method]}
+
+    def is_connected(self, show_traceback=False):
+        return True
+
+
+def get_cases():
+    """{name: callable} of the measured operations, the modules are imported once the stub is in place"""
+    from models.provider import set_provider
+
+    config.CACHE_DIR = tempfile.mkdtemp(prefix="bitlayer-micro-")
+    set_provider("bitlayer", StubProvider())
+
+    from models.wallet import Wallet
+    from modules.bitcow import BitCow
+    from modules.bitlayer import Bitlayer
+    from modules.config import BITCOW, BITCOW_ABI
+    from modules.wrapper import Wrapper
+
+    wallet = Wallet(PRIVATE_KEY, "[1/1]")
+    bitlayer = Bitlayer(PRIVATE_KEY, "[1/1]")
+    bitcow = BitCow(PRIVATE_KEY, "[1/1]")
+    wrapper = Wrapper(PRIVATE_KEY, "[1/1]")
+
+    swap = bitcow.contract.functions.swapBTCtoERC20([POOL], [True], 0)
+    swap_tx = bitcow.build_tx(swap, value=10**13)
+
+    return {
+        "Account.from_key": lambda: Account.from_key(PRIVATE_KEY),
+        "Wallet()": lambda: Wallet(PRIVATE_KEY, "[1/1]"),
+        "Bitlayer()": lambda: Bitlayer(PRIVATE_KEY, "[1/1]"),
+        "BitCow()": lambda: BitCow(PRIVATE_KEY, "[1/1]"),
+        "Wrapper()": lambda: Wrapper(PRIVATE_KEY, "[1/1]"),
+        "get_contract": lambda: wallet.get_contract(BITCOW, abi=BITCOW_ABI),
+        "encodeABI swapBTCtoERC20": lambda: bitcow.contract.encodeABI("swapBTCtoERC20", [[POOL], [True], 0]),
+        "build_tx swapBTCtoERC20": lambda: bitcow.build_tx(swap, value=10**13),
+        "sign_tx": lambda: bitcow.sign_tx(swap_tx),
+        "sign_message": lambda: bitlayer.client.sign_message("BITLAYER"),
+        "Wrapper deposit build + sign": lambda: wrapper.sign_tx(wrapper.build_deposit(0.000001)),
+    }
+
+
+def measure(function, repeat):
+    """Best time of one call in microseconds, over `repeat` rounds of at least 0.2s each"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 10**6
+
+
+def get_environment():
+    return {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor()}
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return None
+
+    with open(BASELINE_PATH) as file:
+        return json.load(file)
+
+
+def save_baseline(results):
+    with open(BASELINE_PATH, "w") as file:
+        json.dump({"environment": get_environment(), "cases": results}, file, indent=2)
+        file.write("\n")
+
+
+def compare(results, baseline, threshold):
+    """Prints the results next to the baseline, returns the names of the cases over the threshold"""
+    table = Table(title="Microbenchmarks (µs per call)")
+    for column in ["Case", "Now", "Baseline", "Change", ""]:
+        table.add_column(column, justify="left" if column == "Case" else "right", no_wrap=True)
+
+    regressions = []
+    for name, time in results.items():
+        base = baseline["cases"].get(name) if baseline else None
+
+        if base is None:
+            table.add_row(name, f"{time:.1f}", "-", "-", "new")
+            continue
+
+        change = time / base - 1
+        status = ""
+        if change > threshold:
+            regressions.append(name)
+            status = "[red]regression[/red]"
+        elif change < -threshold:
+            status = "[green]faster[/green]"
+
+        table.add_row(name, f"{time:.1f}", f"{base:.1f}", f"{change:+.0%}", status)
+
+    Console(width=120).print(table)
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CPU cost of the per-wallet hot paths")
+    parser.add_argument("--save", action="store_true", help="Write the results to benchmarks/baseline.json")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Allowed slowdown, 0.3 = 30%%")
+    parser.add_argument("--repeat", type=int, default=5, help="Rounds per case, the best one counts")
+    parser.add_argument("--cases", nargs="+", metavar="CASE", help="Only run these cases")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cases = get_cases()
+    if args.cases:
+        cases = {name: cases[name] for name in args.cases}
+
+    results = {name: round(measure(function, args.repeat), 2) for name, function in cases.items()}
+
+    baseline = load_baseline()
+    if baseline and baseline["environment"] != get_environment():
+        config.logger.warning(f"Baseline was recorded on {baseline['environment']}, timings may not compare")
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        # A partial run only replaces the cases it measured
+        save_baseline({**(baseline["cases"] if baseline else {}), **results})
+        config.logger.success(f"{BASELINE_PATH} saved")
+    elif regressions:
+        config.logger.error(f"Slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+import argparse
+import json
+import math
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+CHECK_IN_TASK = 36
+BROWSE_TASK = 1
+SHARE_TASK = 2
+BRIDGE_TASK = 3
+ONGOING_TASK = 100
+TOTAL_TXN_TASK = 200
+
+ERROR_STATUSES = (500, 502, 503, 504)
+Z_99 = 2.326  # z-score of the 99th percentile
+
+
+class ApiConditions:
+    """
+    Adverse conditions of the simulated API, applied to every request.
+
+    Latency is log-normal with the given median and p99 in milliseconds, fixed when there is no p99.
+    `rate_limit_rate` and `error_rate` are the shares of requests answered with a 429 (with Retry-After)
+    and a random 5xx. Sessions older than `session_ttl` seconds are rejected with a 401, 0 = never.
+    """
+
+    def __init__(
+        self, latency=0, latency_p99=None, rate_limit_rate=0, error_rate=0, session_ttl=0, retry_after=1, seed=None
+    ):
+        self.latency = latency
+        self.latency_p99 = latency_p99
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.session_ttl = session_ttl
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+    def get_latency(self):
+        """Seconds to hold the next response"""
+        if not self.latency:
+            return 0
+        if not self.latency_p99 or self.latency_p99 <= self.latency:
+            return self.latency / 1000
+
+        sigma = math.log(self.latency_p99 / self.latency) / Z_99
+        return self.latency * math.exp(self.random.gauss(0, sigma)) / 1000
+
+    def get_fault(self):
+        """Status of an injected failure for the next request, None to answer it normally"""
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return self.random.choice(ERROR_STATUSES)
+        return None
+
+
+class WalletState:
+    """What the mock API remembers about one wallet"""
+
+    def __init__(self):
+        self.points = 0
+        self.completed = set()
+        self.check_in_progress = 0
+        self.draws = 1
+        self.boxes = 10
+        self.started = set()
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections are not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.api.dispatch(self, "GET")
+
+    def do_POST(self):
+        self.server.api.dispatch(self, "POST")
+
+    def reply(self, code, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockBitlayerApi:
+    """
+    Local stand-in for the www.bitlayer.org endpoints used by `BitlayerApiClient`.
+
+    Logins hand out a session cookie, requests without a known one get a 401. Task, draw and box state
+    is kept per wallet: a task is claimable once started, a browse once reported, a claimed task shows up
+    as completed and a check-in advances its progress. `conditions` adds latency, 429s, 5xx errors and
+    session expiry, `stats` counts the responses per (route, status).
+    """
+
+    def __init__(self, port=0, conditions=None):
+        self.conditions = conditions or ApiConditions()
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.wallets = {}
+        self.stats = Counter()
+        self.server = ApiServer(("127.0.0.1", port), MockApiHandler)
+        self.server.api = self
+
+        self.routes = [
+            ("POST", r"/me/login", self.login),
+            ("GET", r"/me/tasks", self.get_user_data),
+            ("POST", r"/me/task/start", self.start_task),
+            ("POST", r"/me/task/verify", self.verify),
+            ("POST", r"/me/task/claim", self.claim),
+            ("POST", r"/me/task/report", self.report),
+            ("GET", r"/api/draw/car", self.draw),
+            ("GET", r"/api/draw/result/[^/]+", self.get_draw_result),
+            ("GET", r"/api/btcfi/daily-check", self.success),
+            ("GET", r"/api/btcfi/claim-order", self.claim_order),
+            ("GET", r"/mining-gala", self.get_mining_gala_info),
+            ("GET", r"/api/mining-gala/box", self.get_box),
+            ("GET", r"/api/mining-gala/result/[^/]+", self.get_unboxing_status),
+            ("GET", r"/assemble-cars", self.get_car_info),
+            ("POST", r"/api/raffle/assemble", self.ok),
+            ("GET", r"/airdrop/btr/awards", self.get_awards),
+        ]
+
+    @property
+    def url(self):
+        # aiohttp keeps no cookies of IP hosts, so the async client needs a host name
+        return f"http://localhost:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="mock-api", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def reset(self):
+        """Forgets task progress of every wallet and the stats, sessions stay valid"""
+        with self.lock:
+            self.wallets.clear()
+            self.stats.clear()
+
+    def dispatch(self, request, method):
+        path = urlsplit(request.path).path
+        length = int(request.headers.get("Content-Length") or 0)
+        body = json.loads(request.rfile.read(length)) if length else {}
+
+        for route_method, pattern, handler in self.routes:
+            if route_method == method and re.fullmatch(pattern, path):
+                break
+        else:
+            request.reply(404, {"message": "not found"})
+            return
+
+        with self.lock:
+            latency, fault = self.conditions.get_latency(), self.conditions.get_fault()
+
+        time.sleep(latency)
+        code, data, headers = self.handle(request, handler, body, fault)
+
+        with self.lock:
+            self.stats[pattern, code] += 1
+        request.reply(code, data, headers)
+
+    def handle(self, request, handler, body, fault):
+        """Returns (status, body, headers) of a routed request"""
+        if fault == 429:
+            return 429, {"message": "too many requests"}, {"Retry-After": str(self.conditions.retry_after)}
+        if fault:
+            return fault, {"message": "server error"}, None
+
+        if handler == self.login:
+            return self.login(body)
+
+        address = self.get_session(request)
+        if not address:
+            return 401, {"message": "unauthorized"}, None
+
+        with self.lock:
+            wallet = self.wallets.setdefault(address, WalletState())
+            code, data = handler(wallet, body)
+
+        return code, data, None
+
+    def get_session(self, request):
+        """Address of the request's session, None when it is unknown or expired"""
+        for cookie in (request.headers.get("Cookie") or "").split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name != "session":
+                continue
+
+            with self.lock:
+                address, created_at = self.sessions.get(value, (None, 0))
+
+                ttl = self.conditions.session_ttl
+                if address and ttl and time.time() - created_at > ttl:
+                    del self.sessions[value]
+                    return None
+
+            return address
+
+    def login(self, body):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[token] = (body["address"].lower(), time.time())
+
+        return 200, {"message": "ok"}, {"Set-Cookie": f"session={token}; Path=/"}
+
+    # Endpoints, (wallet state, json body) -> (status, response)
+    def ok(self, wallet, body):
+        return 200, {"message": "ok"}
+
+    def success(self, wallet, body):
+        return 200, {"success": True}
+
+    def get_task(self, wallet, task_id, title, progress=0):
+        return {
+            "taskId": task_id,
+            "title": title,
+            "mainTitle": "",
+            "taskType": 1,
+            "rewardPoints": 20,
+            "isCompleted": task_id in wallet.completed,
+            "canClaim": task_id not in wallet.completed,
+            "extraData": {"cur_done_progress": progress},
+            "action": {"payload": {"progress_cfg": [{"key": day, "value": day * 10} for day in range(1, 8)]}},
+        }
+
+    def get_user_data(self, wallet, body):
+        ongoing_points = 0 if ONGOING_TASK in wallet.completed else 15
+
+        return 200, {
+            "profile": {
+                "totalPoints": wallet.points,
+                "btr": 0,
+                "level": 1,
+                "daysOnBitlayer": 1,
+                "txn": len(wallet.completed),
+            },
+            "meInfo": {"rank": 1},
+            "tasks": {
+                "ongoingTask": {"taskId": ONGOING_TASK, "rewardPoints": ongoing_points},
+                "dailyTasks": [
+                    # The check-in is the first daily task and the bridge the last, the modules rely on it
+                    self.get_task(wallet, CHECK_IN_TASK, "Daily Check-in", wallet.check_in_progress),
+                    self.get_task(wallet, BROWSE_TASK, "Daily Browse"),
+                    self.get_task(wallet, SHARE_TASK, "Daily Share"),
+                    self.get_task(wallet, BRIDGE_TASK, "Daily Bridge"),
+                ],
+                "advanceTasks": [self.get_task(wallet, TOTAL_TXN_TASK, "Total TXN 10")],
+            },
+            "carUserInfo": {"remainFreeDrawAmount": wallet.draws},
+        }
+
+    def start_task(self, wallet, body):
+        wallet.started.add(body["taskId"])
+        return self.ok(wallet, body)
+
+    def verify(self, wallet, body):
+        if body["taskId"] not in wallet.started:
+            return 400, {"message": "task not started"}
+
+        wallet.completed.add(ONGOING_TASK)
+        wallet.points += 15
+        return self.ok(wallet, body)
+
+    def claim(self, wallet, body):
+        if body["taskId"] in wallet.completed:
+            return 400, {"message": "already claimed"}
+        if body["taskId"] in (BROWSE_TASK, SHARE_TASK) and body["taskId"] not in wallet.started:
+            return 400, {"message": "task not started"}
+
+        wallet.completed.add(body["taskId"])
+        wallet.points += 20
+        return self.ok(wallet, body)
+
+    def report(self, wallet, body):
+        return 200, {"checked": body["taskId"] in wallet.started}
+
+    def claim_order(self, wallet, body):
+        wallet.check_in_progress += 1
+        wallet.completed.add(CHECK_IN_TASK)
+        return 200, {"success": True, "data": {"orderId": str(int(time.time()))}}
+
+    def draw(self, wallet, body):
+        wallet.draws = max(wallet.draws - 1, 0)
+        return 200, {"drawId": str(uuid.uuid4())}
+
+    def get_draw_result(self, wallet, body):
+        return 200, {"itemInfos": [{"itemName": "wheel", "star": 3}]}
+
+    def get_mining_gala_info(self, wallet, body):
+        return 200, {"userInfo": {"unopened_count": wallet.boxes, "unboxing_count": 0, "btr": 0}}
+
+    def get_box(self, wallet, body):
+        count, wallet.boxes = wallet.boxes, 0
+        return 200, {"box_id": str(uuid.uuid4()), "expire_at": int(time.time()) + 600, "count": count}
+
+    def get_unboxing_status(self, wallet, body):
+        return 200, {"status": 3, "btr": 2.5, "count": 10}
+
+    def get_car_info(self, wallet, body):
+        items = [{"star": star, "amount": 1, "itemName": f"part {part}"} for star in (3, 4) for part in range(4)]
+        items[-1]["amount"] = 0  # One 4-star part missing
+
+        return 200, {
+            "userInfo": {"normalCarAmount": 0, "premiumCarAmount": 0, "topCarAmount": 0, "itemList": items}
+        }
+
+    def get_awards(self, wallet, body):
+        amount = str(10**18)
+        return 200, {
+            "eligible": True,
+            "bronze": {"amount": amount},
+            "silver": {"amount": amount},
+            "gold": {"amount": amount},
+            "amount": str(3 * 10**18),
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local stand-in of the www.bitlayer.org API")
+    parser.add_argument("--port", type=int, default=8547)
+    parser.add_argument("--latency", type=float, default=0, help="Median response latency, ms")
+    parser.add_argument("--latency-p99", type=float, help="p99 response latency, ms")
+    parser.add_argument("--rate-limit-rate", type=float, default=0, help="Share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of requests answered with a 5xx")
+    parser.add_argument("--session-ttl", type=float, default=0, help="Seconds until a session expires, 0 = never")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of the 429 responses, seconds")
+    parser.add_argument("--seed", type=int, help="Seed of the injected latency and faults")
+    return parser.parse_args()
+
+
+def get_conditions(args):
+    return ApiConditions(
+        args.latency,
+        args.latency_p99,
+        args.rate_limit_rate,
+        args.error_rate,
+        args.session_ttl,
+        args.retry_after,
+        args.seed,
+    )
+
+
+def main():
+    args = parse_args()
+    api = MockBitlayerApi(args.port, get_conditions(args))
+
+    print(f"Serving the Bitlayer API on {api.url}, set BITLAYER_API in modules/config.py to use it")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        for (route, status), count in sorted(api.stats.items()):
+            print(f"{status} {route}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
+import argparse
+import asyncio
+import atexit
+import multiprocessing
+import threading
 import time
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timezone
 from itertools import cycle
 from random import randint, shuffle
 
@@ -7,7 +13,26 @@ import questionary
 from questionary import Style
 
 import settings
+from models.cooldown import get_cooldown_scheduler
+from models.day_scheduler import get_day_scheduler
+from models.identity import get_identity
+from models.metrics import start_metrics_server, write_metrics_file
+from models.provider import open_async_sessions
+from models.report_writer import flush_reports
+from models.run_journal import get_run_journal
+from models.shards import ShardMonitor, ShardRun, connect_shard, init_shard_worker, split_shards
+from models.work_queue import (
+    IDLE_WAIT,
+    JobRun,
+    LeaseKeeper,
+    get_work_queue,
+    get_worker_id,
+    is_loopback,
+    open_work_queue,
+    start_work_queue_server,
+)
 from modules.actions import ActionHandler
+from modules.async_actions import AsyncActionHandler
 from modules.config import logger
 from modules.utils import sleep
 
@@ -30,55 +55,383 @@ def load_recipients(file_path):
     return recipients
 
 
-def wait_until_midnight_utc():
-    """Waits until a random UTC time between 00:02 and 05:30 on the next day."""
-    now = datetime.now(timezone.utc)
-
-    rand_minute, rand_hour = randint(2, 30), randint(0, 5)
-    target_time = (now + timedelta(days=1)).replace(hour=rand_hour, minute=rand_minute, second=0)
-    # Calculate waiting time until the next midnight UTC
-    time_to_wait = (target_time - now).total_seconds()
+def get_time_to_next_due(day_scheduler, wallets):
+    """Returns the seconds until the next wallet of the daily plan is due and logs when that is."""
+    next_due = day_scheduler.get_next_due(wallets)
+    time_to_wait = max(next_due - time.time(), 0)
 
     if time_to_wait > 0:
         hours, remainder = divmod(time_to_wait, 3600)
         minutes, seconds = divmod(remainder, 60)
-        target_time_str = target_time.strftime("%H:%M")
+        next_due_str = datetime.fromtimestamp(next_due, timezone.utc).strftime("%H:%M")
 
         logger.info(
-            f"Waiting until {target_time_str} UTC ({int(hours)} hours, {int(minutes)} minutes, {int(seconds)} seconds)..."
+            f"Next wallet due at {next_due_str} UTC ({int(hours)} hours, {int(minutes)} minutes, {int(seconds)} seconds)..."
+        )
+    return time_to_wait
+
+
+def run_wallet(index, key, total, action_callback, recipients, *args, **kwargs):
+    # Check if this is claim_airdrop which needs recipient parameter
+    if hasattr(action_callback, "__name__") and "claim_airdrop" in str(action_callback):
+        # Get recipient for this wallet (cycle through recipients if fewer than keys)
+        recipient_index = (index - 1) % len(recipients) if recipients else 0
+        recipient = recipients[recipient_index] if recipients else None
+        return action_callback(key, index, total, recipient, *args, **kwargs)
+
+    return action_callback(key, index, total, *args, **kwargs)
+
+
+def get_outcome(tx_status):
+    """Status a wallet is recorded with, a falsy tx status (e.g. a tx that failed every retry) runs again"""
+    return "done" if tx_status else "failed"
+
+
+def get_pending_wallets(keys, run):
+    """Returns (index, key) of the wallets the run has not finished yet, indexes stay those of keys.txt"""
+    pending = [(index, key) for index, key in enumerate(keys, start=1) if not run.is_done(key)]
+
+    if len(pending) < len(keys):
+        logger.info(f"Resuming run #{run.run_id}: {len(keys) - len(pending)}/{len(keys)} wallets already done")
+
+    return pending
+
+
+def run_wallets_concurrently(wallets, total, action_callback, recipients, action_handler, run, *args, **kwargs):
+    """
+    Runs up to MAX_CONCURRENT_WALLETS wallets at once, at most MAX_SESSIONS_PER_PROXY per proxy.
+
+    The pause after a wallet keeps its slot busy on the cooldown scheduler instead of sleeping in a worker,
+    so every thread in the pool is running a wallet.
+    """
+    slots = threading.Semaphore(settings.MAX_CONCURRENT_WALLETS)
+    scheduler = get_cooldown_scheduler()
+
+    def worker(index, key):
+        tx_status = None
+
+        try:
+            with action_handler.lock_proxy(index):
+                tx_status = run_wallet(index, key, total, action_callback, recipients, *args, **kwargs)
+            run.record(key, get_outcome(tx_status))
+
+        except Exception as error:
+            logger.error(f"[{index}/{total}] Error processing wallet: {error} \n")
+            run.record(key, "failed")
+
+        finally:
+            if tx_status:
+                scheduler.call_later(randint(*settings.SLEEP_BETWEEN_WALLETS), slots.release)
+            else:
+                slots.release()
+
+    with ThreadPoolExecutor(max_workers=settings.MAX_CONCURRENT_WALLETS) as executor:
+        futures = []
+        for index, key in wallets:
+            slots.acquire()
+            futures.append(executor.submit(worker, index, key))
+        wait(futures)
+
+
+def run_wallets(wallets, total, action_callback, recipients, action_handler, run, *args, **kwargs):
+    """Runs the action for (index, key) wallets and reports every outcome to `run`."""
+    if settings.MAX_CONCURRENT_WALLETS > 1:
+        return run_wallets_concurrently(
+            wallets, total, action_callback, recipients, action_handler, run, *args, **kwargs
         )
-        time.sleep(time_to_wait)
-    logger.info(f"It's {target_time_str} UTC. Starting execution.\n")
 
+    for position, (index, key) in enumerate(wallets, start=1):
+        try:
+            tx_status = run_wallet(index, key, total, action_callback, recipients, *args, **kwargs)
+            run.record(key, get_outcome(tx_status))
+
+            # Sleep between wallets
+            if tx_status and position < len(wallets):
+                sleep(*settings.SLEEP_BETWEEN_WALLETS)
+
+        except Exception as error:
+            logger.error(f"[{index}/{total}] Error processing wallet: {error} \n")
+            run.record(key, "failed")
+
+
+def process_wallets(keys, action_callback, recipients, action_handler, run, *args, **kwargs):
+    """Runs the action for every wallet the run has not finished yet, see `RunJournal`"""
+    wallets = get_pending_wallets(keys, run)
+    run_wallets(wallets, len(keys), action_callback, recipients, action_handler, run, *args, **kwargs)
+    run.finish()
+
+
+def process_wallets_daily(keys, action_callback, recipients, action_handler, day_scheduler, *args, **kwargs):
+    """INFINITY_LOOP: runs every wallet whenever it is due in the daily plan, see `DayScheduler`"""
+    wallets = day_scheduler.plan(keys)
 
-def process_wallets(keys, action_callback, recipients, *args, **kwargs):
     while True:
-        for index, key in enumerate(keys, start=1):
-            try:
-                # Check if this is claim_airdrop which needs recipient parameter
-                if hasattr(action_callback, "__name__") and "claim_airdrop" in str(action_callback):
-                    # Get recipient for this wallet (cycle through recipients if fewer than keys)
-                    recipient_index = (index - 1) % len(recipients) if recipients else 0
-                    recipient = recipients[recipient_index] if recipients else None
-                    tx_status = action_callback(key, index, len(keys), recipient, *args, **kwargs)
-                else:
-                    tx_status = action_callback(key, index, len(keys), *args, **kwargs)
-
-                # Sleep between wallets
-                if tx_status and index < len(keys):
-                    sleep(*settings.SLEEP_BETWEEN_WALLETS)
-
-            except Exception as error:
-                logger.error(f"[{index}/{len(keys)}] Error processing wallet: {error} \n")
-
-        if settings.INFINITY_LOOP:
-            logger.success("All done! 🎉")
-            wait_until_midnight_utc()
+        due = day_scheduler.get_due(wallets)
+
+        if due:
+            run_wallets(due, len(keys), action_callback, recipients, action_handler, day_scheduler, *args, **kwargs)
         else:
+            time.sleep(get_time_to_next_due(day_scheduler, wallets))
+
+
+async def run_wallets_async(wallets, total, action_callback, recipients, action_handler, run, *args, **kwargs):
+    """Drives (index, key) wallets from one event loop, at most MAX_CONCURRENT_WALLETS in flight."""
+    semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_WALLETS)
+    loop = asyncio.get_running_loop()
+
+    async def worker(index, key):
+        tx_status = None
+        await semaphore.acquire()
+
+        try:
+            async with action_handler.lock_proxy(index):
+                tx_status = await run_wallet(index, key, total, action_callback, recipients, *args, **kwargs)
+            run.record(key, get_outcome(tx_status))
+
+        except Exception as error:
+            logger.error(f"[{index}/{total}] Error processing wallet: {error} \n")
+            run.record(key, "failed")
+
+        finally:
+            # The pause is a loop timer holding the slot, not a task holding the proxy and the wallet objects
+            if tx_status:
+                loop.call_later(randint(*settings.SLEEP_BETWEEN_WALLETS), semaphore.release)
+            else:
+                semaphore.release()
+
+    await asyncio.gather(*(worker(index, key) for index, key in wallets))
+
+
+async def process_wallets_async(keys, action_callback, recipients, action_handler, run, *args, **kwargs):
+    """Awaitable `process_wallets`"""
+    await open_async_sessions()
+
+    wallets = get_pending_wallets(keys, run)
+    await run_wallets_async(wallets, len(keys), action_callback, recipients, action_handler, run, *args, **kwargs)
+    run.finish()
+
+
+async def process_wallets_daily_async(
+    keys, action_callback, recipients, action_handler, day_scheduler, *args, **kwargs
+):
+    """Awaitable `process_wallets_daily`, waiting for the next due wallet costs no thread"""
+    await open_async_sessions()
+    wallets = day_scheduler.plan(keys)
+
+    while True:
+        due = day_scheduler.get_due(wallets)
+
+        if due:
+            await run_wallets_async(
+                due, len(keys), action_callback, recipients, action_handler, day_scheduler, *args, **kwargs
+            )
+        else:
+            await asyncio.sleep(get_time_to_next_due(day_scheduler, wallets))
+
+
+def run_shard(shard, keys, proxies, recipients, action, run_id):
+    """One worker process of `process_wallets_sharded`, runs its shard with `process_wallets`"""
+    connect_shard(shard)
+
+    if settings.ASYNC_MODE:
+        action_handler = AsyncActionHandler(keys, proxies, recipients)
+    else:
+        action_handler = ActionHandler(keys, proxies, recipients)
+
+    if settings.USE_PROXY:
+        action_handler.proxy_pool.start()
+
+    action_callback = action_handler.get_action_map()[action]
+    run = ShardRun(get_run_journal().get_run(run_id, action), shard)
+
+    try:
+        if settings.ASYNC_MODE:
+            asyncio.run(process_wallets_async(keys, action_callback, recipients, action_handler, run))
+        else:
+            process_wallets(keys, action_callback, recipients, action_handler, run)
+    finally:
+        flush_reports()
+
+
+def process_wallets_sharded(shards, action, run):
+    """
+    --workers: runs every shard of `split_shards` in its own process, so signing and parsing use all cores.
+
+    Logs, report rows and wallet outcomes of the shards are sent back and handled here, see `ShardMonitor`.
+    The run is finished once every shard went through.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    monitor = ShardMonitor(queue, shards, run).start()
+    stopped = False
+
+    logger.info(f"Running {sum(len(keys) for keys, _, _ in shards)} wallets in {len(shards)} worker processes")
+
+    try:
+        with ProcessPoolExecutor(
+            len(shards), mp_context=context, initializer=init_shard_worker, initargs=(queue,)
+        ) as executor:
+            futures = {
+                executor.submit(run_shard, shard, keys, proxies, recipients, action, run.run_id): shard
+                for shard, (keys, proxies, recipients) in enumerate(shards)
+            }
+
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    future.result()
+                    logger.info(f"Worker {shard + 1} is through: {monitor.get_progress(shard)}")
+                except Exception as error:
+                    logger.error(f"Worker {shard + 1} stopped: {error}")
+                    stopped = True
+    finally:
+        monitor.stop()
+
+    monitor.log_progress()
+    if not stopped:
+        run.finish()
+
+
+def lease_jobs(queue, worker, keeper):
+    """Next jobs of a queue worker: [] while other workers hold every open job, None once the queue is through"""
+    jobs = queue.lease(worker, settings.MAX_CONCURRENT_WALLETS)
+    if jobs:
+        keeper.add(jobs)
+        return jobs
+
+    counts = queue.get_counts()
+    return [] if counts.get("pending") or counts.get("leased") else None
+
+
+def get_job_batches(jobs, wallets, action_map, keeper):
+    """Groups leased jobs by action into (action, [(index, key)], JobRun), indexes are those of this keys.txt"""
+    batches = {}
+
+    for job in jobs:
+        if job["wallet"] not in wallets or job["action"] not in action_map:
+            logger.error(f"{job['wallet']} ({job['action']}): wallet or action unknown to this worker")
+            keeper.complete(job, "failed")
+            continue
+
+        index, key = wallets[job["wallet"]]
+        batch_wallets, batch_jobs = batches.setdefault(job["action"], ([], {}))
+        batch_wallets.append((index, key))
+        batch_jobs[key] = job
+
+    return [
+        (action, batch_wallets, JobRun(keeper, batch_jobs)) for action, (batch_wallets, batch_jobs) in batches.items()
+    ]
+
+
+def process_queue(queue, keys, recipients, action_handler):
+    """--worker: runs the wallet jobs leased from the coordinator until the queue is through, see `WorkQueue`"""
+    worker = get_worker_id()
+    keeper = LeaseKeeper(queue, worker).start()
+    action_map = action_handler.get_action_map()
+    wallets = {get_identity(key).wallet: (index, key) for index, key in enumerate(keys, start=1)}
+
+    logger.info(f"Worker {worker} started")
+
+    while True:
+        jobs = lease_jobs(queue, worker, keeper)
+        if jobs is None:
+            break
+        if not jobs:
+            time.sleep(IDLE_WAIT)
+            continue
+
+        for action, batch, run in get_job_batches(jobs, wallets, action_map, keeper):
+            run_wallets(batch, len(keys), action_map[action], recipients, action_handler, run)
+
+    logger.success("Queue is through")
+
+
+async def process_queue_async(queue, keys, recipients, action_handler):
+    """Awaitable `process_queue`"""
+    await open_async_sessions()
+
+    worker = get_worker_id()
+    keeper = LeaseKeeper(queue, worker).start()
+    action_map = action_handler.get_action_map()
+    wallets = {get_identity(key).wallet: (index, key) for index, key in enumerate(keys, start=1)}
+
+    logger.info(f"Worker {worker} started")
+
+    while True:
+        jobs = await asyncio.to_thread(lease_jobs, queue, worker, keeper)
+        if jobs is None:
+            break
+        if not jobs:
+            await asyncio.sleep(IDLE_WAIT)
+            continue
+
+        for action, batch, run in get_job_batches(jobs, wallets, action_map, keeper):
+            await run_wallets_async(batch, len(keys), action_map[action], recipients, action_handler, run)
+
+    logger.success("Queue is through")
+
+
+def run_coordinator(address, actions, keys, force):
+    """--coordinator: queues the actions for every wallet and serves the queue until every job is through"""
+    host, port = address.rsplit(":", 1)
+    if not settings.QUEUE_TOKEN and not is_loopback(host):
+        logger.error(f"Set QUEUE_TOKEN in settings.py to serve the queue on '{host}', anyone reaching it gets the jobs")
+        return
+
+    queue = get_work_queue()
+    queue.load(actions, keys, force)
+
+    server = start_work_queue_server(queue, host, int(port))
+    last_counts = None
+
+    while True:
+        counts = queue.get_counts()
+        if counts != last_counts:
+            logger.info(f"Queue: {', '.join(f'{count} {status}' for status, count in sorted(counts.items()))}")
+            last_counts = counts
+
+        if not counts.get("pending") and not counts.get("leased"):
             break
+        time.sleep(IDLE_WAIT)
+
+    # Idle workers learn that the queue is through on their next lease
+    time.sleep(IDLE_WAIT * 2)
+    server.shutdown()
+    server.server_close()
+    logger.success("Queue is through")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Start the selected action over instead of resuming its interrupted run",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split the wallets and proxies over this many processes, one per CPU core at most makes sense",
+    )
+    parser.add_argument(
+        "--coordinator",
+        nargs="?",
+        const="127.0.0.1:8600",
+        metavar="HOST:PORT",
+        help="Queue the selected actions for every wallet and serve them to --worker processes (127.0.0.1:8600), "
+        "a host other hosts can reach needs QUEUE_TOKEN",
+    )
+    parser.add_argument(
+        "--worker",
+        metavar="URL",
+        help="Run wallet jobs of the coordinator at this URL (or of a queue file on this host)",
+    )
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
     keys = load_keys("keys.txt")
     proxies = load_proxies("proxies.txt") if settings.USE_PROXY else []
     recipients = load_recipients("recipients.txt")
@@ -101,7 +454,30 @@ def main():
     elif settings.SHUFFLE_WALLETS:
         shuffle(keys)
 
-    action_handler = ActionHandler(keys, proxies, recipients)
+    if settings.ASYNC_MODE:
+        action_handler = AsyncActionHandler(keys, proxies, recipients)
+    else:
+        action_handler = ActionHandler(keys, proxies, recipients)
+
+    if args.workers > 1 and settings.INFINITY_LOOP:
+        logger.warning("--workers is not used with INFINITY_LOOP, the daily plan runs in one process")
+
+    # Shard processes check their own proxies, the coordinator runs no wallets
+    if settings.USE_PROXY and (args.workers <= 1 or settings.INFINITY_LOOP) and not args.coordinator:
+        action_handler.proxy_pool.start()
+
+    if settings.METRICS_PORT:
+        start_metrics_server(settings.METRICS_PORT)
+    if settings.METRICS_FILE:
+        atexit.register(write_metrics_file, settings.METRICS_FILE)
+
+    if args.worker:
+        queue = open_work_queue(args.worker)
+        if settings.ASYNC_MODE:
+            asyncio.run(process_queue_async(queue, keys, recipients, action_handler))
+        else:
+            process_queue(queue, keys, recipients, action_handler)
+        return
 
     action_map = action_handler.get_action_map()
     action_choices = list(action_map.keys())
@@ -113,6 +489,17 @@ def main():
         ]
     )
 
+    if args.coordinator:
+        actions = questionary.checkbox(
+            "Select the actions to queue:",
+            choices=[action for action in action_choices if action != "Parse Accounts"],
+            style=custom_style,
+        ).ask()
+
+        if actions:
+            run_coordinator(args.coordinator, actions, keys, args.force)
+        return
+
     # Present action choices to the user
     action = questionary.select(
         "Select an action to perform:",
@@ -122,10 +509,30 @@ def main():
 
     # Execute the selected action
     if action in action_map:
-        if action == "📝 Parse Accounts":
+        if action == "Parse Accounts" and settings.ASYNC_MODE:
+            asyncio.run(action_map[action]())
+        elif action == "Parse Accounts":
             action_map[action]()
+        elif settings.INFINITY_LOOP:
+            day_scheduler = get_day_scheduler(action)
+            if args.force:
+                day_scheduler.reset()
+
+            if settings.ASYNC_MODE:
+                asyncio.run(
+                    process_wallets_daily_async(keys, action_map[action], recipients, action_handler, day_scheduler)
+                )
+            else:
+                process_wallets_daily(keys, action_map[action], recipients, action_handler, day_scheduler)
+        elif args.workers > 1:
+            run = get_run_journal().start_run(action, force=args.force)
+            process_wallets_sharded(split_shards(keys, proxies, recipients, args.workers), action, run)
+        elif settings.ASYNC_MODE:
+            run = get_run_journal().start_run(action, force=args.force)
+            asyncio.run(process_wallets_async(keys, action_map[action], recipients, action_handler, run))
         else:
-            process_wallets(keys, action_map[action], recipients)
+            run = get_run_journal().start_run(action, force=args.force)
+            process_wallets(keys, action_map[action], recipients, action_handler, run)
 
 
 if __name__ == "__main__":
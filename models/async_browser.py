@@ -0,0 +1,75 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import aiohttp
+from fake_useragent import UserAgent
+
+import settings
+from models.metrics import HTTP_RETRIES
+from models.proxy_pool import IP_CHECK_URL, get_cached_exit_ip, save_exit_ip
+from modules.config import logger
+
+
+class AsyncBrowser:
+    """aiohttp counterpart of `Browser` with the same headers and retry policy"""
+
+    RETRY_TOTAL = 5
+    BACKOFF_FACTOR = 0.5
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, label, proxy=None):
+        self.label = label
+        self.ua = UserAgent()
+        self.proxy = proxy
+        self.session = self.create_session()
+
+    def create_session(self):
+        return aiohttp.ClientSession(
+            headers={
+                "Accept": "*/*",
+                "Content-Type": "application/json",
+                "Origin": "https://www.bitlayer.org",
+                "Referer": "https://www.bitlayer.org/me",
+                "User-Agent": self.ua.random,
+            },
+            timeout=aiohttp.ClientTimeout(total=60),
+        )
+
+    async def request(self, method, url, **kwargs):
+        """Sends a request through the proxy, retrying 429 and 5xx responses with exponential backoff or Retry-After"""
+        for attempt in range(self.RETRY_TOTAL + 1):
+            response = await self.session.request(method, url, proxy=self.proxy, **kwargs)
+
+            if response.status not in self.RETRY_STATUSES or attempt == self.RETRY_TOTAL:
+                return response
+
+            response.release()
+            HTTP_RETRIES.inc(urlsplit(url).hostname, str(response.status))
+            await asyncio.sleep(self.get_retry_delay(response, attempt))
+
+    def get_retry_delay(self, response, attempt):
+        """Seconds before the next attempt, the server's Retry-After when it sends one in seconds"""
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return int(retry_after)
+        return self.BACKOFF_FACTOR * (2**attempt)
+
+    async def close(self):
+        await self.session.close()
+
+    async def check_ip(self):
+        try:
+            proxy = self.proxy if settings.USE_PROXY else None
+            ip = get_cached_exit_ip(proxy)
+
+            if not ip:
+                async with self.session.get(
+                    IP_CHECK_URL, proxy=proxy, timeout=aiohttp.ClientTimeout(total=10)
+                ) as resp:
+                    ip = (await resp.json())["origin"]
+                save_exit_ip(proxy, ip)
+
+            logger.info(f"{self.label} Current IP: {ip}")
+
+        except Exception as error:
+            logger.error(f"{self.label} Failed to get IP: {error}")
@@ -0,0 +1,262 @@
+import settings
+from models.chain_cache import get_chain_cache
+from models.cooldown import Cooldown
+from models.fee_oracle import get_async_fee_oracle
+from models.gas_profile import get_gas_profile
+from models.identity import get_identity
+from models.multicall import AsyncMulticall
+from models.nonce_manager import get_async_nonce_manager, is_nonce_error
+from models.provider import get_contract, get_async_web3
+from models.receipt_watcher import get_receipt_watcher
+from modules.config import CHAIN_DATA, ERC20_ABI, logger
+
+
+class AsyncWallet:
+    """Awaitable twin of `Wallet`, built on AsyncWeb3 so many wallets can share one event loop"""
+
+    def __init__(self, private_key, counter=None, chain="bitlayer"):
+        self.identity = get_identity(private_key)
+        self.private_key = private_key
+        self.account = self.identity.account
+        self.address = self.identity.address
+
+        self.chain = chain
+        self.web3 = get_async_web3(chain)
+        self.explorer = CHAIN_DATA[chain]["explorer"]
+
+        self.counter = counter
+        self.label = f"{self.counter} {self.address} | "
+
+        self.nonce_manager = get_async_nonce_manager(chain, self.address)
+        self.fee_oracle = get_async_fee_oracle(chain)
+        self.gas_profile = get_gas_profile(chain)
+        self.cooldown = Cooldown()
+
+    def __str__(self):
+        return f"AsyncWallet(address={self.address})"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        pass
+
+    async def get_tx_count(self):
+        return await self.web3.eth.get_transaction_count(self.address)
+
+    def to_checksum(self, address):
+        return self.web3.to_checksum_address(address)
+
+    def get_contract(self, address, abi=None):
+        """Shared contract object of this chain, see `models.provider.get_contract`"""
+        return get_contract(self.chain, address, abi or ERC20_ABI, is_async=True)
+
+    async def get_balance(self, token_addr=None):
+        if token_addr == None:
+            balance = await self.web3.eth.get_balance(self.address)
+        else:
+            token = self.get_contract(token_addr)
+            balance = await token.functions.balanceOf(self.address).call()
+
+        return balance
+
+    async def read_token(self, token, *functions):
+        """
+        Reads balance, decimals and symbol of a token plus any extra calls in one eth_call.
+        Decimals and symbol never change, so they are read once and then served from the chain cache.
+        """
+        chain_cache = get_chain_cache()
+        metadata = chain_cache.get(self.chain, token.address, "erc20")
+        if metadata and None in metadata:
+            metadata = None  # Failed read cached by an older version
+
+        multicall = AsyncMulticall(self.chain)
+        multicall.add(token.functions.balanceOf(self.address))
+        for function in functions:
+            multicall.add(function)
+        if not metadata:
+            multicall.add(token.functions.decimals())
+            multicall.add(token.functions.symbol())
+
+        results = await multicall.execute()
+
+        if not metadata:
+            metadata = results[-2:]
+            results = results[:-2]
+            # A failed read is no fact about the token, it is read again next time
+            if None not in metadata:
+                chain_cache.set(self.chain, token.address, "erc20", metadata)
+
+        # Multicall turns failed calls into None, the callers do math on every value
+        if None in results or None in metadata:
+            raise Exception(f"Failed to read token {token.address}")
+
+        balance, *extra = results
+        decimals, symbol = metadata
+        return (balance, decimals, symbol, *extra)
+
+    async def get_token(self, token_addr, dict=False):
+        token = self.get_contract(token_addr)
+
+        balance, decimals, symbol = await self.read_token(token)
+
+        if dict:
+            return {
+                "balance": balance,
+                "decimals": decimals,
+                "symbol": symbol,
+            }
+
+        return balance, decimals, symbol
+
+    async def get_tx_data(self, value=0, **kwargs):
+        return {
+            "chainId": CHAIN_DATA[self.chain]["chain_id"],
+            "from": self.address,
+            # The nonce is reserved in `submit_tx`, this is the one the tx is expected to get
+            "nonce": await self.nonce_manager.peek(),
+            "value": value,
+            **await self.fee_oracle.get_fees(),
+            **kwargs,
+        }
+
+    async def build_tx(self, function, value=0, **kwargs):
+        """
+        Builds a contract call, the gas limit comes from the gas profile instead of eth_estimateGas when known.
+
+        A learned limit skips the estimate, which was also the check that the call does not revert on the
+        current state, so the call is simulated with eth_call instead and raises before anything is sent.
+        """
+        tx_data = await self.get_tx_data(value=value, **kwargs)
+
+        gas = self.gas_profile.get_limit(function)
+        if not gas or "gas" in tx_data:
+            return await function.build_transaction(tx_data)
+
+        tx_data["gas"] = gas
+        tx = await function.build_transaction(tx_data)
+        # The built tx rather than `function.call()`, which needs the ABI to list the outputs
+        await self.web3.eth.call({key: tx[key] for key in ("from", "to", "value", "data")})
+        return tx
+
+    def sign_tx(self, tx):
+        return self.web3.eth.account.sign_transaction(tx, self.identity.key)
+
+    async def submit_tx(self, tx, tx_label=""):
+        """Reserves a local nonce, signs and broadcasts the tx without waiting for its receipt"""
+        await self.cooldown.async_wait()
+
+        tx["nonce"] = await self.nonce_manager.get_nonce()
+
+        try:
+            tx_hash = await self.web3.eth.send_raw_transaction(self.sign_tx(tx).rawTransaction)
+
+        except Exception as error:
+            # The local counter is out of step with the chain, take a fresh nonce and send once more
+            await self.nonce_manager.resync()
+            if not is_nonce_error(error):
+                raise
+
+            tx["nonce"] = await self.nonce_manager.get_nonce()
+            tx_hash = await self.web3.eth.send_raw_transaction(self.sign_tx(tx).rawTransaction)
+
+        logger.info(f"{tx_label} | {self.explorer}/tx/{tx_hash.hex()}")
+        return tx_hash
+
+    async def send_tx(self, tx, tx_label="", retry=0, gas_increment=1.2):
+        try:
+            if retry > 0:
+                # Increment gas by 10% for each retry
+                tx["gas"] = int(tx["gas"] * gas_increment)
+
+            tx_hash = await self.submit_tx(tx, tx_label)
+
+            tx_receipt = await get_receipt_watcher(self.chain).async_wait(tx_hash, timeout=400)
+            self.gas_profile.learn(tx, tx_receipt)
+
+            attempts = f"after {retry + 1} attempts" if retry > 0 else ""
+
+            if tx_receipt.status == 1:
+                logger.success(f"{tx_label} | Tx confirmed {attempts} \n")
+                return tx_receipt.status
+
+            # Reverted with gas to spare: a retry with more gas would revert the same way
+            if tx_receipt.gasUsed < tx["gas"]:
+                logger.error(f"{tx_label} | Tx reverted \n")
+                return None
+
+            raise Exception(f"{tx_label} | Tx Failed \n")
+
+        except Exception as error:
+            logger.error(f"{tx_label} | {error} \n")
+            await self.nonce_manager.resync()
+            if retry < settings.RETRY_COUNT:
+                self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
+                return await self.send_tx(tx, tx_label, retry=retry + 1)
+
+    async def send_txs(self, txs, timeout=400):
+        """Submits several txs back-to-back and waits for all receipts together, see `Wallet.send_txs`"""
+        tx_hashes = []
+        for tx, tx_label in txs:
+            try:
+                tx_hashes.append(await self.submit_tx(tx, f"{tx_label} [{await self.nonce_manager.peek()}]"))
+            except Exception as error:
+                logger.error(f"{tx_label} | {error} \n")
+                tx_hashes.append(None)
+
+        receipts = await self.wait_for_receipts([tx_hash for tx_hash in tx_hashes if tx_hash], timeout)
+
+        statuses = []
+        for position, ((tx, tx_label), tx_hash) in enumerate(zip(txs, tx_hashes), start=1):
+            # The line of the last tx closes the batch with a line break
+            end = " \n" if position == len(txs) else ""
+            receipt = receipts.get(tx_hash) if tx_hash else None
+            status = receipt.status if receipt else None
+            if receipt:
+                self.gas_profile.learn(tx, receipt)
+
+            if status == 1:
+                logger.success(f"{tx_label} [{tx['nonce']}] | Tx confirmed{end}")
+            elif tx_hash:
+                logger.error(f"{tx_label} [{tx['nonce']}] | Tx Failed{end}")
+            statuses.append(status)
+
+        # Dropped, replaced or reverted txs leave the local counter ahead of the chain
+        if not all(status == 1 for status in statuses):
+            await self.nonce_manager.resync()
+
+        return statuses
+
+    async def wait_for_receipts(self, tx_hashes, timeout=400):
+        """Waits for the receipts of many txs on the chain's shared receipt watcher, returns {tx_hash: receipt}"""
+        return await get_receipt_watcher(self.chain).async_wait_all(tx_hashes, timeout)
+
+    async def check_allowance(self, token_addr, spender):
+        token = self.get_contract(token_addr)
+
+        return await token.functions.allowance(self.address, spender).call()
+
+    async def approve(self, token_address, spender, amount, tx_label):
+        token = self.get_contract(token_address)
+
+        # Token state and allowance in a single eth_call. The balance changes with the swap right before,
+        # so it is read per wallet anyway, and an allowance read up front across wallets saves no call
+        allowance_function = token.functions.allowance(self.address, spender)
+        balance, decimals, symbol, allowance = await self.read_token(token, allowance_function)
+
+        if balance == 0:
+            logger.info(f"{tx_label} | Your {symbol} is 0")
+            return
+
+        if allowance >= balance:
+            logger.debug(f"{tx_label} | {balance / 10 ** decimals:.8f} {symbol} already approved")
+            return
+
+        tx = await self.build_tx(token.functions.approve(spender, amount))
+
+        status = await self.send_tx(tx, tx_label)
+        self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
+        return status
@@ -4,9 +4,20 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 import settings
+from models.metrics import HTTP_RETRIES
+from models.proxy_pool import get_exit_ip
 from modules.config import logger
 
 
+class MeteredRetry(Retry):
+    """urllib3 Retry counting every retry in the bitlayer_http_retries_total metric"""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        reason = str(response.status) if response is not None else type(error).__name__
+        HTTP_RETRIES.inc(_pool.host if _pool else "unknown", reason)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
 class Browser:
     def __init__(self, label, proxy=None):
         self.label = label
@@ -18,10 +29,10 @@ class Browser:
         session = requests.Session()
 
         # Configure retries
-        retries = Retry(
+        retries = MeteredRetry(
             total=5,  # Increase the number of retries here
             backoff_factor=0.5,  # Wait time between retries (exponential backoff)
-            status_forcelist=[500, 502, 503, 504],  # Retry on these HTTP status codes
+            status_forcelist=[429, 500, 502, 503, 504],  # Retry on these HTTP status codes, after Retry-After if set
             allowed_methods=frozenset(["GET", "POST"]),  # Methods to retry
         )
 
@@ -45,14 +56,11 @@ class Browser:
         return session
 
     def check_ip(self):
-        proxy = self.proxy
+        proxy = self.proxy if settings.USE_PROXY else None
 
         try:
-            proxies = {"http": proxy, "https": proxy} if settings.USE_PROXY else None
-            resp = self.session.get(
-                "https://httpbin.org/ip", proxies=proxies, timeout=10
-            )
-            ip = resp.json()["origin"]
+            # The proxy pool's health checks keep the exit IP fresh, httpbin is only asked on a cache miss
+            ip = get_exit_ip(proxy, self.session)
             logger.info(f"{self.label} Current IP: {ip}")
 
         except Exception as error:
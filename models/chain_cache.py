@@ -0,0 +1,65 @@
+import json
+import os
+import sqlite3
+import threading
+
+from modules.config import CACHE_DIR
+
+
+class ChainCache:
+    """
+    On-disk store for chain facts that never change, keyed by (chain, address, key).
+
+    Everything is loaded into memory when the cache is opened, so lookups never touch disk or RPC.
+    Only immutable data belongs here: token decimals/symbol, deployed contract code and the like,
+    plus learned gas limits, which correct themselves when a tx runs out of gas.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            "chain TEXT, address TEXT, key TEXT, value TEXT, PRIMARY KEY (chain, address, key))"
+        )
+        self.db.commit()
+
+        rows = self.db.execute("SELECT chain, address, key, value FROM facts")
+        self.facts = {(chain, address, key): json.loads(value) for chain, address, key, value in rows}
+
+    def get(self, chain, address, key, default=None):
+        return self.facts.get((chain, address.lower(), key), default)
+
+    def set(self, chain, address, key, value, persist=True):
+        """Stores a fact, `persist=False` keeps it for this process only"""
+        address = address.lower()
+
+        with self.lock:
+            self.facts[(chain, address, key)] = value
+
+            if not persist:
+                return
+
+            self.db.execute(
+                "INSERT OR REPLACE INTO facts VALUES (?, ?, ?, ?)",
+                (chain, address, key, json.dumps(value)),
+            )
+            self.db.commit()
+
+
+_chain_cache = None
+_lock = threading.Lock()
+
+
+def get_chain_cache():
+    """Returns the process-wide chain cache, opening it on first use"""
+    global _chain_cache
+
+    if _chain_cache is None:
+        with _lock:
+            if _chain_cache is None:
+                _chain_cache = ChainCache(os.path.join(CACHE_DIR, "chain.db"))
+
+    return _chain_cache
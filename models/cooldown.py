@@ -0,0 +1,94 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from modules.config import logger
+
+
+class Cooldown:
+    """
+    Deferred pause between two actions of one wallet.
+
+    `defer()` only records when the next action may run, `wait()` / `async_wait()` sleep for whatever
+    is left of it right before that action. Work done in between counts towards the pause, and a pause
+    after the last action of a wallet costs nothing.
+    """
+
+    def __init__(self):
+        self.ready_at = 0
+
+    def defer(self, min_time, max_time=None):
+        duration = random.randint(min_time, max_time) if max_time is not None else min_time
+        self.ready_at = max(self.ready_at, time.monotonic() + duration)
+
+    def get_remaining(self):
+        return max(self.ready_at - time.monotonic(), 0)
+
+    def wait(self):
+        remaining = self.get_remaining()
+        if remaining:
+            time.sleep(remaining)
+
+    async def async_wait(self):
+        remaining = self.get_remaining()
+        if remaining:
+            await asyncio.sleep(remaining)
+
+
+class CooldownScheduler:
+    """
+    Heap of wake-ups served by a single thread.
+
+    Callbacks run on the scheduler thread once their time comes, so they should only hand work off
+    (release a slot, submit to an executor) instead of doing it.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()  # Tie-breaker, callbacks are not comparable
+        self.lock = threading.Condition()
+        self.thread = None
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def call_at(self, when, callback, *args):
+        with self.lock:
+            heapq.heappush(self.heap, (when, next(self.counter), callback, args))
+
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, name="cooldowns", daemon=True)
+                self.thread.start()
+
+            self.lock.notify()
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    self.lock.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+
+                _, _, callback, args = heapq.heappop(self.heap)
+
+            try:
+                callback(*args)
+            except Exception as error:
+                logger.error(f"Cooldown callback failed: {error}")
+
+
+_scheduler = None
+_lock = threading.Lock()
+
+
+def get_cooldown_scheduler():
+    """Returns the process-wide cooldown scheduler"""
+    global _scheduler
+
+    with _lock:
+        if _scheduler is None:
+            _scheduler = CooldownScheduler()
+
+    return _scheduler
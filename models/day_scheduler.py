@@ -0,0 +1,149 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import settings
+from models.identity import get_identity
+from modules.config import CACHE_DIR, logger
+
+DAY = 24 * 60 * 60
+HOUR = 60 * 60
+# Seconds before a wallet that failed is tried again, in a later hour of the window
+RETRY_DELAY = HOUR
+
+
+class DayScheduler:
+    """
+    INFINITY_LOOP plan of one action: every wallet runs once a day at its own time.
+
+    Daily runs are spread at random over the DAILY_WINDOW_UTC hours, with at most WALLETS_PER_HOUR
+    wallets in one hour, overflow moves to the next day. Wallets new to the plan, and wallets that missed
+    their hour while the bot was stopped, get a slot of the window from now on the same way instead of
+    all running at once. Next-due times live on disk, so a restart keeps the plan.
+
+    `record()` has the signature of `Run.record`, so wallet runners report to either.
+    """
+
+    def __init__(self, path, action):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.action = action
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS schedule ("
+            "action TEXT, wallet TEXT, due_at REAL, last_run_at REAL, last_status TEXT, PRIMARY KEY (action, wallet))"
+        )
+        self.db.commit()
+
+        rows = self.db.execute("SELECT wallet, due_at FROM schedule WHERE action = ?", (action,)).fetchall()
+        self.due = dict(rows)
+        self.hours = Counter(int(due_at // HOUR) for due_at in self.due.values())
+
+    @staticmethod
+    def get_wallet(key):
+        return get_identity(key).wallet
+
+    def has_capacity(self, hour):
+        return not settings.WALLETS_PER_HOUR or self.hours[hour] < settings.WALLETS_PER_HOUR
+
+    def find_slot(self, day, after=None):
+        """Returns a random time in the first window from `day` (days since epoch) with a free hour, from `after` on"""
+        start, end = settings.DAILY_WINDOW_UTC
+        now = after or time.time()
+
+        while True:
+            hours = [day * 24 + hour for hour in range(start, end)]
+            hours = [hour for hour in hours if (hour + 1) * HOUR > now and self.has_capacity(hour)]
+
+            if hours:
+                hour = random.choice(hours)
+                return max(random.uniform(hour * HOUR, (hour + 1) * HOUR), now)
+
+            day += 1
+
+    def set_due(self, wallet, due_at, status=None):
+        previous = self.due.get(wallet)
+        if previous is not None:
+            self.hours[int(previous // HOUR)] -= 1
+
+        self.due[wallet] = due_at
+        self.hours[int(due_at // HOUR)] += 1
+
+        self.db.execute(
+            "INSERT INTO schedule (action, wallet, due_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (action, wallet) DO UPDATE SET due_at = excluded.due_at",
+            (self.action, wallet, due_at),
+        )
+        if status:
+            self.db.execute(
+                "UPDATE schedule SET last_run_at = ?, last_status = ? WHERE action = ? AND wallet = ?",
+                (time.time(), status, self.action, wallet),
+            )
+        self.db.commit()
+
+    def plan(self, keys):
+        """
+        Adds wallets that have no next-due time yet and re-slots the ones whose hour passed while the bot
+        was stopped, returns {key: wallet address}
+        """
+        wallets = {key: self.get_wallet(key) for key in keys}
+        now = time.time()
+        missed = 0
+
+        with self.lock:
+            for wallet in wallets.values():
+                if wallet not in self.due:
+                    self.set_due(wallet, self.find_slot(int(now // DAY)))
+                elif self.due[wallet] // HOUR < now // HOUR:
+                    self.set_due(wallet, self.find_slot(int(now // DAY)))
+                    missed += 1
+
+        if missed:
+            logger.info(f"{missed} wallets missed their hour while the bot was stopped, planned again from now on")
+
+        return wallets
+
+    def get_due(self, wallets):
+        """
+        Returns (index, key) of the wallets due now, indexes stay those of keys.txt.
+        A wallet that fell due while this process runs stays due until it ran, however late that is.
+        """
+        now = time.time()
+
+        with self.lock:
+            return [
+                (index, key)
+                for index, (key, wallet) in enumerate(wallets.items(), start=1)
+                if self.due[wallet] <= now
+            ]
+
+    def get_next_due(self, wallets):
+        with self.lock:
+            return min(self.due[wallet] for wallet in wallets.values())
+
+    def record(self, key, status):
+        """Moves a wallet that just ran to its slot of the next day, a failed one gets another try later today"""
+        wallet = self.get_wallet(key)
+        now = time.time()
+
+        with self.lock:
+            if status == "failed":
+                self.set_due(wallet, self.find_slot(int(now // DAY), after=now + RETRY_DELAY), status)
+            else:
+                self.set_due(wallet, self.find_slot(int(now // DAY) + 1), status)
+
+    def reset(self):
+        """Forgets the plan, every wallet becomes due again"""
+        with self.lock:
+            self.db.execute("DELETE FROM schedule WHERE action = ?", (self.action,))
+            self.db.commit()
+            self.due.clear()
+            self.hours.clear()
+
+
+def get_day_scheduler(action):
+    return DayScheduler(os.path.join(CACHE_DIR, "schedule.db"), action)
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from statistics import median
+
+import settings
+from models.provider import get_async_web3, get_web3
+from modules.config import logger
+
+
+class FeeOracle:
+    """
+    Keeps current fees of one chain, refreshed from eth_feeHistory at most every FEE_CACHE_TTL seconds.
+
+    `get_fees()` returns tx fields ready to merge into a tx: maxFeePerGas/maxPriorityFeePerGas on
+    EIP-1559 chains, gasPrice on chains without a base fee. With fees set, `build_transaction`
+    skips its own max_priority_fee and get_block("latest") lookups.
+    """
+
+    HISTORY_BLOCKS = 5
+    REWARD_PERCENTILE = 50
+
+    def __init__(self, web3, chain):
+        self.web3 = web3
+        self.chain = chain
+        self.lock = threading.Lock()
+        self.fees = None
+        self.updated_at = 0
+
+    def is_fresh(self):
+        return self.fees is not None and time.time() - self.updated_at < settings.FEE_CACHE_TTL
+
+    def build_fees(self, history):
+        """Turns a fee history into tx fee fields, None when the chain has no base fee"""
+        base_fee = history["baseFeePerGas"][-1] if history["baseFeePerGas"] else 0
+        if not base_fee:
+            return None
+
+        rewards = [reward[0] for reward in history.get("reward") or [] if reward]
+        priority_fee = int(median(rewards)) if rewards else 0
+
+        return {
+            "maxPriorityFeePerGas": priority_fee,
+            # Room for the base fee to keep rising for a few blocks while the fees are cached
+            "maxFeePerGas": 2 * base_fee + priority_fee,
+        }
+
+    def fetch_fees(self):
+        try:
+            history = self.web3.eth.fee_history(self.HISTORY_BLOCKS, "latest", [self.REWARD_PERCENTILE])
+            fees = self.build_fees(history)
+        except Exception as error:
+            logger.debug(f"Fee oracle {self.chain}: eth_feeHistory failed, using gasPrice ({error})")
+            fees = None
+
+        if fees is None:
+            return {"gasPrice": self.web3.eth.gas_price}
+
+        if not fees["maxPriorityFeePerGas"]:
+            fees["maxPriorityFeePerGas"] = self.web3.eth.max_priority_fee
+            fees["maxFeePerGas"] += fees["maxPriorityFeePerGas"]
+
+        return fees
+
+    def get_fees(self):
+        """Returns a copy of the cached fee fields, refreshing them once the TTL is over"""
+        with self.lock:
+            if not self.is_fresh():
+                self.fees = self.fetch_fees()
+                self.updated_at = time.time()
+
+            return dict(self.fees)
+
+
+class AsyncFeeOracle(FeeOracle):
+    """Awaitable twin of `FeeOracle`"""
+
+    def __init__(self, web3, chain):
+        super().__init__(web3, chain)
+        self.lock = asyncio.Lock()
+
+    async def fetch_fees(self):
+        try:
+            history = await self.web3.eth.fee_history(self.HISTORY_BLOCKS, "latest", [self.REWARD_PERCENTILE])
+            fees = self.build_fees(history)
+        except Exception as error:
+            logger.debug(f"Fee oracle {self.chain}: eth_feeHistory failed, using gasPrice ({error})")
+            fees = None
+
+        if fees is None:
+            return {"gasPrice": await self.web3.eth.gas_price}
+
+        if not fees["maxPriorityFeePerGas"]:
+            fees["maxPriorityFeePerGas"] = await self.web3.eth.max_priority_fee
+            fees["maxFeePerGas"] += fees["maxPriorityFeePerGas"]
+
+        return fees
+
+    async def get_fees(self):
+        async with self.lock:
+            if not self.is_fresh():
+                self.fees = await self.fetch_fees()
+                self.updated_at = time.time()
+
+            return dict(self.fees)
+
+
+_lock = threading.Lock()
+_oracles = {}
+_async_oracles = {}
+
+
+def get_fee_oracle(chain):
+    """Returns the fee oracle shared by every wallet on a chain"""
+    with _lock:
+        if chain not in _oracles:
+            _oracles[chain] = FeeOracle(get_web3(chain), chain)
+
+    return _oracles[chain]
+
+
+def get_async_fee_oracle(chain):
+    """Returns the shared `AsyncFeeOracle` of a chain"""
+    with _lock:
+        if chain not in _async_oracles:
+            _async_oracles[chain] = AsyncFeeOracle(get_async_web3(chain), chain)
+
+    return _async_oracles[chain]
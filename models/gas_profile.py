@@ -0,0 +1,64 @@
+import threading
+
+from eth_utils.abi import function_abi_to_4byte_selector
+from hexbytes import HexBytes
+
+import settings
+from models.chain_cache import get_chain_cache
+from modules.config import logger
+
+
+class GasProfile:
+    """
+    Learned gas limits of one chain, keyed by (contract, function selector) and kept in the chain cache.
+
+    Limits come from the gasUsed of mined txs times GAS_LIMIT_MARGIN, so repeated calls of the same
+    function skip eth_estimateGas. A tx that runs out of gas drops its entry and the next build
+    estimates again.
+    """
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.chain_cache = get_chain_cache()
+
+    @staticmethod
+    def get_selector(data):
+        data = HexBytes(data or b"")
+        return data[:4].hex() if len(data) >= 4 else None
+
+    def get_limit(self, function):
+        """Returns the learned gas limit of a bound contract function, None when it has to be estimated"""
+        selector = HexBytes(function_abi_to_4byte_selector(function.abi)).hex()
+
+        return self.chain_cache.get(self.chain, function.address, f"gas:{selector}")
+
+    def learn(self, tx, receipt):
+        """Updates the profile of the called function from a mined tx"""
+        selector = self.get_selector(tx.get("data"))
+        if not tx.get("to") or not selector:
+            return
+
+        key = f"gas:{selector}"
+
+        if receipt["status"] == 1:
+            limit = int(receipt["gasUsed"] * settings.GAS_LIMIT_MARGIN)
+            # Keep the largest limit seen, gas use of a function varies with the state it touches
+            if limit > (self.chain_cache.get(self.chain, tx["to"], key) or 0):
+                self.chain_cache.set(self.chain, tx["to"], key, limit)
+
+        elif receipt["gasUsed"] >= tx["gas"]:
+            logger.debug(f"Gas profile {self.chain}: {tx['to']} {selector} ran out of gas, estimating again")
+            self.chain_cache.set(self.chain, tx["to"], key, None)
+
+
+_lock = threading.Lock()
+_profiles = {}
+
+
+def get_gas_profile(chain):
+    """Returns the gas profile shared by every wallet on a chain"""
+    with _lock:
+        if chain not in _profiles:
+            _profiles[chain] = GasProfile(chain)
+
+    return _profiles[chain]
@@ -0,0 +1,41 @@
+import threading
+
+from eth_account import Account
+from eth_keys import keys
+from hexbytes import HexBytes
+
+
+class Identity:
+    """
+    A private key decoded once: its account, checksum address and the lowercase address used as wallet id.
+
+    Signing with `key` skips decoding the private key again, eth_account does that for a hex key on every call.
+    """
+
+    def __init__(self, private_key):
+        self.private_key = private_key
+        self.key = keys.PrivateKey(HexBytes(private_key))
+        self.account = Account.from_key(self.key)
+        self.address = self.account.address
+        self.wallet = self.address.lower()
+
+
+_identities = {}
+_lock = threading.Lock()
+
+
+def get_identity(private_key):
+    """
+    Returns the identity of a key, decoding it on first use.
+
+    Every module object, journal and queue of a wallet shares it, so a key is decoded once per run
+    instead of once per module object.
+    """
+    identity = _identities.get(private_key)
+
+    if identity is None:
+        identity = Identity(private_key)
+        with _lock:
+            identity = _identities.setdefault(private_key, identity)
+
+    return identity
@@ -0,0 +1,181 @@
+import os
+import re
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from modules.config import logger
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Metric:
+    """Base of the in-process metrics, values are kept per tuple of label values"""
+
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.lock = threading.Lock()
+        self.values = {}
+        REGISTRY.append(self)
+
+    def format_labels(self, values, extra=""):
+        pairs = [f'{label}="{escape(value)}"' for label, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            for values, value in sorted(self.values.items()):
+                lines.extend(self.render_value(values, value))
+        return lines
+
+    def render_value(self, values, value):
+        return [f"{self.name}{self.format_labels(values)} {value}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *values, amount=1):
+        with self.lock:
+            self.values[values] = self.values.get(values, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, *values):
+        with self.lock:
+            self.values[values] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, amount, *values):
+        with self.lock:
+            state = self.values.get(values)
+            if state is None:
+                state = self.values[values] = [[0] * (len(self.buckets) + 1), 0.0]
+
+            state[0][bisect_left(self.buckets, amount)] += 1
+            state[1] += amount
+
+    def render_value(self, values, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{self.format_labels(values, le)} {cumulative}")
+
+        lines.append(f"{self.name}_sum{self.format_labels(values)} {total}")
+        lines.append(f"{self.name}_count{self.format_labels(values)} {cumulative}")
+        return lines
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_endpoint_label(endpoint):
+    """Bitlayer API path without query, ids and hashes replaced so every endpoint is one series"""
+    path = urlsplit(endpoint).path
+    return re.sub(r"/(0x[0-9a-fA-F]+|[0-9a-fA-F-]{16,}|\d+)(?=/|$)", "/{id}", path)
+
+
+def get_proxy_label(proxy):
+    """host:port of a proxy, credentials are never exported"""
+    if not proxy:
+        return "direct"
+    return urlsplit(proxy).netloc.rsplit("@", 1)[-1]
+
+
+REGISTRY = []
+
+RPC_REQUESTS = Counter(
+    "bitlayer_rpc_requests_total", "JSON-RPC requests by chain, method and result", ("chain", "method", "result")
+)
+RPC_LATENCY = Histogram("bitlayer_rpc_request_seconds", "JSON-RPC request latency", ("chain", "method"))
+API_REQUESTS = Counter(
+    "bitlayer_api_requests_total", "Bitlayer API requests by endpoint and status", ("endpoint", "status")
+)
+API_LATENCY = Histogram("bitlayer_api_request_seconds", "Bitlayer API request latency", ("endpoint",))
+HTTP_RETRIES = Counter("bitlayer_http_retries_total", "Browser retries by host and reason", ("host", "reason"))
+PROXY_REQUESTS = Counter("bitlayer_proxy_requests_total", "API requests by proxy and result", ("proxy", "result"))
+PROXY_LATENCY = Histogram("bitlayer_proxy_request_seconds", "API request latency by proxy", ("proxy",))
+PROXY_HEALTHY = Gauge("bitlayer_proxy_healthy", "1 while the proxy is in rotation", ("proxy",))
+PROXY_CHECK_LATENCY = Gauge("bitlayer_proxy_check_seconds", "Smoothed health check latency of the proxy", ("proxy",))
+
+
+def observe_api_request(endpoint, proxy, status, duration):
+    """Records one Bitlayer API round trip, `status` is the HTTP status or the exception name"""
+    endpoint, proxy = get_endpoint_label(endpoint), get_proxy_label(proxy)
+
+    API_REQUESTS.inc(endpoint, str(status))
+    API_LATENCY.observe(duration, endpoint)
+    PROXY_REQUESTS.inc(proxy, "ok" if isinstance(status, int) and status < 500 else "error")
+    PROXY_LATENCY.observe(duration, proxy)
+
+
+def observe_rpc_request(chain, method, ok, duration):
+    """Records one JSON-RPC round trip, `ok` is False when it raised or the node answered with an error"""
+    RPC_REQUESTS.inc(chain, method, "ok" if ok else "error")
+    RPC_LATENCY.observe(duration, chain, method)
+
+
+def render():
+    """Returns every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path):
+    """Writes the metrics for the node_exporter textfile collector, swapping the file in atomically"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(render())
+
+    os.replace(temp_path, path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port):
+    """Serves /metrics on localhost from a daemon thread"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Metrics on http://127.0.0.1:{port}/metrics")
+    return server
@@ -0,0 +1,163 @@
+from eth_utils.abi import collapse_if_tuple, function_abi_to_4byte_selector
+
+import settings
+from models.chain_cache import get_chain_cache
+from models.provider import get_async_web3, get_contract, get_web3
+from modules.config import CHAIN_DATA, ERC20_ABI, MULTICALL3
+
+MULTICALL3_ABI = [
+    {
+        "type": "function",
+        "name": "aggregate3",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    }
+]
+
+
+class Multicall:
+    """
+    Resolves many contract reads in a single eth_call through Multicall3's aggregate3.
+
+    The Multicall3 address comes from CHAIN_DATA[chain]["multicall"] and defaults to the canonical
+    deployment, so a dev chain only needs its own address set there. When it is set to None, or no
+    code is deployed at it, the calls are made one by one.
+
+    Usage:
+        multicall = Multicall("bitlayer")
+        multicall.add(token.functions.balanceOf(address))
+        multicall.add(token.functions.decimals())
+        balance, decimals = multicall.execute()
+    """
+
+    is_async = False
+
+    def __init__(self, chain="bitlayer", address=None):
+        self.chain = chain
+        self.web3 = self.get_web3(chain)
+        self.address = address or CHAIN_DATA[chain].get("multicall", MULTICALL3)
+        self.functions = []
+
+        if self.address:
+            self.contract = get_contract(chain, self.address, MULTICALL3_ABI, is_async=self.is_async)
+
+    def get_web3(self, chain):
+        return get_web3(chain)
+
+    def is_deployed(self):
+        """Checks once per chain that Multicall3 has code, the answer is kept in the chain cache"""
+        chain_cache = get_chain_cache()
+        code = chain_cache.get(self.chain, self.address, "code")
+
+        if code is None:
+            code = self.web3.eth.get_code(self.contract.address).hex()
+            # Missing code is only remembered for this run, a contract may get deployed later
+            chain_cache.set(self.chain, self.address, "code", code, persist=code not in ("", "0x"))
+
+        return code not in ("", "0x")
+
+    def add(self, function):
+        """Queues a bound contract function, e.g. `token.functions.balanceOf(address)`"""
+        self.functions.append(function)
+        return len(self.functions) - 1
+
+    def encode(self, function):
+        selector = function_abi_to_4byte_selector(function.abi)
+        input_types = [collapse_if_tuple(item) for item in function.abi["inputs"]]
+        return selector + self.web3.codec.encode(input_types, function.args)
+
+    def decode(self, function, success, data):
+        """Decodes a call result, failed calls come back as None"""
+        if not success:
+            return None
+
+        output_types = [collapse_if_tuple(item) for item in function.abi["outputs"]]
+        values = self.web3.codec.decode(output_types, data)
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def build_calls(self, functions):
+        return [(function.address, True, self.encode(function)) for function in functions]
+
+    def execute(self):
+        """Runs all queued calls and returns their results in the order they were added"""
+        functions, self.functions = self.functions, []
+
+        if not self.address or len(functions) == 1 or not self.is_deployed():
+            return [function.call() for function in functions]
+
+        calls = self.build_calls(functions)
+
+        results = []
+        for start in range(0, len(calls), settings.MULTICALL_BATCH_SIZE):
+            results += self.contract.functions.aggregate3(
+                calls[start : start + settings.MULTICALL_BATCH_SIZE]
+            ).call()
+
+        return [self.decode(function, *result) for function, result in zip(functions, results)]
+
+
+class AsyncMulticall(Multicall):
+    """Awaitable twin of `Multicall`"""
+
+    is_async = True
+
+    def get_web3(self, chain):
+        return get_async_web3(chain)
+
+    async def is_deployed(self):
+        chain_cache = get_chain_cache()
+        code = chain_cache.get(self.chain, self.address, "code")
+
+        if code is None:
+            code = (await self.web3.eth.get_code(self.contract.address)).hex()
+            chain_cache.set(self.chain, self.address, "code", code, persist=code not in ("", "0x"))
+
+        return code not in ("", "0x")
+
+    async def execute(self):
+        functions, self.functions = self.functions, []
+
+        if not self.address or len(functions) == 1 or not await self.is_deployed():
+            return [await function.call() for function in functions]
+
+        calls = self.build_calls(functions)
+
+        results = []
+        for start in range(0, len(calls), settings.MULTICALL_BATCH_SIZE):
+            results += await self.contract.functions.aggregate3(
+                calls[start : start + settings.MULTICALL_BATCH_SIZE]
+            ).call()
+
+        return [self.decode(function, *result) for function, result in zip(functions, results)]
+
+
+def get_token_balances(token_addr, owners, chain="bitlayer"):
+    """Returns {owner: balanceOf(owner)} for many addresses in as few eth_calls as possible"""
+    token = get_contract(chain, token_addr, ERC20_ABI)
+
+    multicall = Multicall(chain)
+    for owner in owners:
+        multicall.add(token.functions.balanceOf(owner))
+
+    return dict(zip(owners, multicall.execute()))
+
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+from models.provider import get_async_web3, get_web3
+
+# Node errors meaning the local nonce no longer matches the chain
+NONCE_ERRORS = ("nonce too low", "nonce too high", "replacement transaction underpriced")
+
+
+def is_nonce_error(error):
+    return any(message in str(error).lower() for message in NONCE_ERRORS)
+
+
+class NonceManager:
+    """
+    Hands out nonces for one (chain, address) locally, so building a tx costs no eth_getTransactionCount.
+
+    The first nonce is read from the pending state; after that nonces are counted up in memory.
+    Call `resync()` whenever a tx was dropped, replaced or rejected so the counter follows the chain again.
+    """
+
+    def __init__(self, web3, address):
+        self.web3 = web3
+        self.address = address
+        self.lock = threading.Lock()
+        self.next_nonce = None
+
+    def fetch_nonce(self):
+        return self.web3.eth.get_transaction_count(self.address, "pending")
+
+    def get_nonce(self):
+        """Reserves the next nonce"""
+        with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = self.fetch_nonce()
+
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def peek(self):
+        """Returns the nonce the next tx will get without reserving it"""
+        with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = self.fetch_nonce()
+
+            return self.next_nonce
+
+    def resync(self):
+        with self.lock:
+            self.next_nonce = self.fetch_nonce()
+
+
+class AsyncNonceManager(NonceManager):
+    """Awaitable twin of `NonceManager`"""
+
+    def __init__(self, web3, address):
+        super().__init__(web3, address)
+        self.lock = asyncio.Lock()
+
+    async def fetch_nonce(self):
+        return await self.web3.eth.get_transaction_count(self.address, "pending")
+
+    async def get_nonce(self):
+        async with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = await self.fetch_nonce()
+
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    async def peek(self):
+        async with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = await self.fetch_nonce()
+
+            return self.next_nonce
+
+    async def resync(self):
+        async with self.lock:
+            self.next_nonce = await self.fetch_nonce()
+
+
+_lock = threading.Lock()
+_managers = {}
+_async_managers = {}
+
+
+def get_nonce_manager(chain, address):
+    """Returns the nonce manager shared by every wallet object of an address on a chain"""
+    with _lock:
+        if (chain, address) not in _managers:
+            _managers[(chain, address)] = NonceManager(get_web3(chain), address)
+
+    return _managers[(chain, address)]
+
+
+def get_async_nonce_manager(chain, address):
+    """Returns the shared `AsyncNonceManager` of an address on a chain"""
+    with _lock:
+        if (chain, address) not in _async_managers:
+            _async_managers[(chain, address)] = AsyncNonceManager(get_async_web3(chain), address)
+
+    return _async_managers[(chain, address)]
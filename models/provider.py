@@ -0,0 +1,170 @@
+import threading
+import time
+
+import requests
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from requests.adapters import HTTPAdapter
+from web3 import AsyncHTTPProvider, AsyncWeb3, HTTPProvider, Web3
+from web3.middleware import (
+    abi_middleware,
+    async_attrdict_middleware,
+    async_geth_poa_middleware,
+    attrdict_middleware,
+    geth_poa_middleware,
+)
+
+import settings
+from models.metrics import observe_rpc_request
+from modules.config import CHAIN_DATA
+
+_lock = threading.Lock()
+_session = None
+_web3 = {}
+_async_web3 = {}
+_contracts = {}
+
+
+class MeteredHTTPProvider(HTTPProvider):
+    """HTTPProvider recording count and latency of every JSON-RPC method per chain"""
+
+    def __init__(self, chain, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chain = chain
+
+    def make_request(self, method, params):
+        started_at = time.perf_counter()
+        response = None
+
+        try:
+            response = super().make_request(method, params)
+            return response
+        finally:
+            ok = response is not None and "error" not in response
+            observe_rpc_request(self.chain, method, ok, time.perf_counter() - started_at)
+
+
+class MeteredAsyncHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider counterpart of `MeteredHTTPProvider`"""
+
+    def __init__(self, chain, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chain = chain
+
+    async def make_request(self, method, params):
+        started_at = time.perf_counter()
+        response = None
+
+        try:
+            response = await super().make_request(method, params)
+            return response
+        finally:
+            ok = response is not None and "error" not in response
+            observe_rpc_request(self.chain, method, ok, time.perf_counter() - started_at)
+
+
+def get_session():
+    """Returns the process-wide keep-alive session shared by every RPC endpoint"""
+    global _session
+
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(CHAIN_DATA), pool_maxsize=settings.RPC_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+
+    return _session
+
+
+def get_web3(chain):
+    """
+    Returns the shared Web3 instance for a chain from CHAIN_DATA.
+
+    The middleware stack is trimmed to what the modules rely on: POA block formatting,
+    attribute access on results and ABI request formatting. ENS resolution, gas price
+    strategy and chain id validation are left out, the latter costs an extra eth_chainId per call.
+    """
+    web3 = _web3.get(chain)
+    if web3 is not None:
+        return web3
+
+    with _lock:
+        if chain not in _web3:
+            provider = MeteredHTTPProvider(
+                chain,
+                CHAIN_DATA[chain]["rpc"],
+                request_kwargs={"timeout": 60},
+                session=get_session(),
+            )
+            _web3[chain] = create_web3(provider)
+
+    return _web3[chain]
+
+
+def create_web3(provider):
+    """Web3 over `provider` with the middleware stack of `get_web3`"""
+    web3 = Web3(provider, middlewares=[(attrdict_middleware, "attrdict"), (abi_middleware, "abi")])
+    web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    return web3
+
+
+def set_provider(chain, provider):
+    """Serves a chain from another provider, e.g. the offline stub of the microbenchmarks"""
+    with _lock:
+        _web3[chain] = create_web3(provider)
+
+        for key in [key for key in _contracts if key[0] == chain and not key[3]]:
+            del _contracts[key]
+
+
+def get_async_web3(chain):
+    """Returns the shared AsyncWeb3 instance for a chain, see `get_web3`"""
+    web3 = _async_web3.get(chain)
+    if web3 is not None:
+        return web3
+
+    with _lock:
+        if chain not in _async_web3:
+            provider = MeteredAsyncHTTPProvider(
+                chain, CHAIN_DATA[chain]["rpc"], request_kwargs={"timeout": ClientTimeout(total=60)}
+            )
+            web3 = AsyncWeb3(provider, middlewares=[(async_attrdict_middleware, "attrdict")])
+            web3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+            _async_web3[chain] = web3
+
+    return _async_web3[chain]
+
+
+def get_contract(chain, address, abi, is_async=False):
+    """
+    Returns the shared contract object of (chain, address, abi), built on first use.
+
+    Contract objects hold no wallet state, so the module objects of every wallet share them instead of
+    parsing the ABI again. ABIs are module constants and are told apart by identity, the cache keeps
+    each of them alive so an id is never reused.
+    """
+    key = (chain, address, id(abi), is_async)
+    entry = _contracts.get(key)
+
+    if entry is None:
+        web3 = get_async_web3(chain) if is_async else get_web3(chain)
+        contract = web3.eth.contract(address=web3.to_checksum_address(address), abi=abi)
+
+        with _lock:
+            entry = _contracts.setdefault(key, (abi, contract))
+
+    return entry[1]
+
+
+async def open_async_sessions():
+    """Caches a sized keep-alive aiohttp session for every chain on the running event loop"""
+    for chain in CHAIN_DATA:
+        session = ClientSession(
+            connector=TCPConnector(limit=settings.RPC_POOL_SIZE, keepalive_timeout=60),
+            raise_for_status=True,
+        )
+        cached_session = await get_async_web3(chain).provider.cache_async_session(session)
+
+        # A session was already cached for this endpoint on the running loop
+        if cached_session is not session:
+            await session.close()
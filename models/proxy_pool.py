@@ -0,0 +1,223 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+
+import requests
+
+import settings
+from models.metrics import PROXY_CHECK_LATENCY, PROXY_HEALTHY, get_proxy_label
+from modules.config import logger
+
+IP_CHECK_URL = "https://httpbin.org/ip"
+
+_exit_ips = {}
+_exit_ips_lock = threading.Lock()
+
+
+def fetch_exit_ip(proxy, session=None, timeout=10):
+    """Asks httpbin for the exit IP of a proxy and caches it, returns (ip, latency in seconds)"""
+    proxies = {"http": proxy, "https": proxy} if proxy else None
+
+    started_at = time.time()
+    response = (session or requests).get(IP_CHECK_URL, proxies=proxies, timeout=timeout)
+    latency = time.time() - started_at
+    ip = response.json()["origin"]
+
+    save_exit_ip(proxy, ip)
+    return ip, latency
+
+
+def save_exit_ip(proxy, ip):
+    with _exit_ips_lock:
+        _exit_ips[proxy] = (ip, time.time())
+
+
+def get_cached_exit_ip(proxy):
+    """Returns the cached exit IP of a proxy, None when it is older than EXIT_IP_TTL"""
+    with _exit_ips_lock:
+        ip, checked_at = _exit_ips.get(proxy, (None, 0))
+
+    return ip if time.time() - checked_at < settings.EXIT_IP_TTL else None
+
+
+def get_exit_ip(proxy, session=None):
+    """Returns the exit IP of a proxy, asking httpbin only when there is no fresh cached one"""
+    return get_cached_exit_ip(proxy) or fetch_exit_ip(proxy, session)[0]
+
+
+class ProxyState:
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.healthy = True  # Unchecked proxies are used until a check says otherwise
+        self.latency = None
+        self.failures = 0
+        self.sessions = 0
+        self.wallets = 0
+
+
+class ProxyPool:
+    """
+    Health-checked pool of proxies with a sticky wallet -> proxy mapping.
+
+    A background thread checks every proxy each PROXY_CHECK_INTERVAL seconds, keeping a latency score and
+    the exit IP. Failing or slow proxies are taken out of rotation until they pass a check again.
+    Wallets keep their proxy while it is healthy and move to the best healthy one otherwise, but never
+    while they hold a lease: the running wallet keeps its proxy until it is done, so at most
+    MAX_SESSIONS_PER_PROXY wallets run through one proxy at a time.
+    """
+
+    MAX_FAILURES = 2
+    MAX_LATENCY = 5
+    LATENCY_ALPHA = 0.3
+
+    def __init__(self, proxies, wallets=()):
+        self.states = {proxy: ProxyState(proxy) for proxy in proxies}
+        self.assignments = {}
+        self.leases = {}  # wallet -> proxy it holds a session slot on
+        self.lock = threading.Condition()
+        self.thread = None
+
+        # Initial sticky pairs, keeps the keys.txt <-> proxies.txt order
+        for wallet, proxy in zip(wallets, proxies):
+            self.assign(wallet, proxy)
+
+    def start(self):
+        """Starts the background health checks"""
+        if self.states and not self.thread:
+            self.thread = threading.Thread(target=self.run, name="proxy-pool", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=min(len(self.states), 16)) as executor:
+            while True:
+                list(executor.map(self.check, list(self.states)))
+                time.sleep(settings.PROXY_CHECK_INTERVAL)
+
+    def check(self, proxy):
+        try:
+            _, latency = fetch_exit_ip(proxy, timeout=self.MAX_LATENCY * 2)
+        except Exception as error:
+            latency = None
+            logger.debug(f"Proxy check failed for {proxy}: {error}")
+
+        with self.lock:
+            state = self.states[proxy]
+
+            if latency is None:
+                state.failures += 1
+            else:
+                state.failures = 0
+                state.latency = latency if state.latency is None else (
+                    self.LATENCY_ALPHA * latency + (1 - self.LATENCY_ALPHA) * state.latency
+                )
+
+            healthy = state.failures < self.MAX_FAILURES and (state.latency or 0) <= self.MAX_LATENCY
+            if healthy != state.healthy:
+                logger.warning(f"Proxy {proxy} is {'back in rotation' if healthy else 'out of rotation'}")
+            state.healthy = healthy
+
+            PROXY_HEALTHY.set(int(healthy), get_proxy_label(proxy))
+            if state.latency is not None:
+                PROXY_CHECK_LATENCY.set(round(state.latency, 3), get_proxy_label(proxy))
+
+            self.lock.notify_all()
+
+    def assign(self, wallet, proxy):
+        previous = self.assignments.get(wallet)
+        if previous:
+            self.states[previous].wallets -= 1
+
+        self.assignments[wallet] = proxy
+        self.states[proxy].wallets += 1
+
+    def get_score(self, state):
+        """Lower is better: fewest wallets assigned first, then the fastest"""
+        return state.wallets, state.latency if state.latency is not None else self.MAX_LATENCY
+
+    def pick(self, wallet, need_slot):
+        """Returns the wallet's proxy, moving it to the best healthy proxy if its own is out of rotation"""
+        proxy = self.assignments.get(wallet)
+        state = self.states.get(proxy)
+
+        if state and state.healthy:
+            if not need_slot or state.sessions < settings.MAX_SESSIONS_PER_PROXY:
+                return proxy
+            return None  # Sticky proxy is busy, wait for it
+
+        candidates = [state for state in self.states.values() if state.healthy] or list(self.states.values())
+        if need_slot:
+            candidates = [state for state in candidates if state.sessions < settings.MAX_SESSIONS_PER_PROXY]
+        if not candidates:
+            return None
+
+        best = min(candidates, key=self.get_score).proxy
+        if proxy:
+            logger.debug(f"Moving wallet from {proxy} to {best}")
+        self.assign(wallet, best)
+        return best
+
+    def get(self, wallet):
+        """
+        Returns the proxy a wallet should use right now, without reserving a session.
+        A wallet holding a lease gets the leased proxy, moving it would put it on a proxy it holds no slot on.
+        """
+        if not self.states:
+            return None
+
+        with self.lock:
+            return self.leases.get(wallet) or self.pick(wallet, need_slot=False)
+
+    def try_acquire(self, wallet):
+        with self.lock:
+            proxy = self.pick(wallet, need_slot=True)
+            if proxy:
+                self.states[proxy].sessions += 1
+                self.leases[wallet] = proxy
+            return proxy
+
+    def release(self, wallet):
+        with self.lock:
+            self.states[self.leases.pop(wallet)].sessions -= 1
+            self.lock.notify_all()
+
+    @contextmanager
+    def lease(self, wallet):
+        """Holds a session slot on the wallet's proxy while the block runs, yields the proxy"""
+        if not self.states:
+            yield None
+            return
+
+        with self.lock:
+            while not (proxy := self.try_acquire(wallet)):
+                self.lock.wait()
+
+        try:
+            yield proxy
+        finally:
+            self.release(wallet)
+
+
+class AsyncProxyPool(ProxyPool):
+    """`ProxyPool` whose leases are awaited on the event loop instead of blocking a thread"""
+
+    def __init__(self, proxies, wallets=()):
+        super().__init__(proxies, wallets)
+        self.released = asyncio.Condition()
+
+    @asynccontextmanager
+    async def lease(self, wallet):
+        if not self.states:
+            yield None
+            return
+
+        async with self.released:
+            proxy = await self.released.wait_for(lambda: self.try_acquire(wallet))
+
+        try:
+            yield proxy
+        finally:
+            self.release(wallet)
+            async with self.released:
+                self.released.notify_all()
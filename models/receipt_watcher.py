@@ -0,0 +1,205 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from hexbytes import HexBytes
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+import settings
+from models.provider import get_web3
+from modules.config import logger
+
+
+class ReceiptWatcher:
+    """
+    Follows the new blocks of one chain and resolves receipt waiters for the txs included in them.
+
+    A single thread per chain polls eth_blockNumber every BLOCK_POLL_INTERVAL seconds and reads each new
+    block once, so RPC load follows the block rate instead of the number of txs being waited on.
+    The thread only runs while there are pending txs.
+
+    A tx sent just before the thread starts can be mined below the first block it reads. Txs that no
+    scanned block contained after LOOKUP_AFTER_SCANS scans get one direct receipt lookup for that reason.
+    """
+
+    RECENT_BLOCKS = 64
+    LOOKUP_AFTER_SCANS = 3
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.web3 = get_web3(chain)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.recent = deque(maxlen=self.RECENT_BLOCKS)
+        self.unseen = {}
+        self.scans = 0
+        self.last_block = None
+        self.thread = None
+
+    def watch(self, tx_hash):
+        """Registers a tx and returns a Future resolved with its receipt"""
+        tx_hash = HexBytes(tx_hash).hex()
+
+        with self.lock:
+            future = self.pending.get(tx_hash)
+            if future is None:
+                future = self.pending[tx_hash] = Future()
+                self.unseen[tx_hash] = self.scans
+
+            # The tx may already be in a block that was scanned before it was registered
+            included = any(tx_hash in hashes for hashes in self.recent)
+
+            if not self.thread or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name=f"receipts-{self.chain}", daemon=True)
+                self.thread.start()
+
+        if included:
+            self.resolve([tx_hash])
+
+        return future
+
+    def wait(self, tx_hash, timeout=400):
+        """Blocks until the tx is mined and returns its receipt, like `wait_for_transaction_receipt`"""
+        future = self.watch(tx_hash)
+
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            return self.check_timed_out(tx_hash, timeout)
+
+    async def async_wait(self, tx_hash, timeout=400):
+        """Awaitable `wait`, the event loop is never blocked while the watcher thread follows blocks"""
+        future = asyncio.wrap_future(self.watch(tx_hash))
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return await asyncio.to_thread(self.check_timed_out, tx_hash, timeout)
+
+    def wait_all(self, tx_hashes, timeout=400):
+        """Waits for many txs at once, returns {tx_hash: receipt} for the ones mined in time"""
+        futures = {tx_hash: self.watch(tx_hash) for tx_hash in tx_hashes}
+        wait(futures.values(), timeout)
+
+        return self.collect(futures, timeout)
+
+    async def async_wait_all(self, tx_hashes, timeout=400):
+        futures = {tx_hash: self.watch(tx_hash) for tx_hash in tx_hashes}
+        if futures:
+            await asyncio.wait([asyncio.wrap_future(future) for future in futures.values()], timeout=timeout)
+
+        return await asyncio.to_thread(self.collect, futures, timeout)
+
+    def collect(self, futures, timeout):
+        receipts = {}
+        for tx_hash, future in futures.items():
+            try:
+                if future.done():
+                    receipts[tx_hash] = future.result()
+                else:
+                    receipts[tx_hash] = self.check_timed_out(tx_hash, timeout)
+            except Exception as error:
+                logger.debug(f"Receipt watcher {self.chain}: {error}")
+
+        return receipts
+
+    def check_timed_out(self, tx_hash, timeout):
+        """Makes one direct receipt lookup for a tx that was not seen in any scanned block"""
+        tx_hash = HexBytes(tx_hash).hex()
+
+        with self.lock:
+            self.pending.pop(tx_hash, None)
+            self.unseen.pop(tx_hash, None)
+
+        try:
+            return self.web3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            raise TimeExhausted(f"Transaction {tx_hash} is not in the chain after {timeout} seconds")
+
+    def resolve(self, tx_hashes):
+        for tx_hash in tx_hashes:
+            with self.lock:
+                future = self.pending.pop(tx_hash, None)
+                self.unseen.pop(tx_hash, None)
+
+            if not future or future.done():
+                continue
+
+            try:
+                future.set_result(self.web3.eth.get_transaction_receipt(tx_hash))
+            except Exception as error:
+                future.set_exception(error)
+
+    def lookup(self, tx_hashes):
+        """Resolves the txs that are already mined, unmined ones are left to the block scan"""
+        for tx_hash in tx_hashes:
+            try:
+                receipt = self.web3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+
+            with self.lock:
+                future = self.pending.pop(tx_hash, None)
+                self.unseen.pop(tx_hash, None)
+
+            if future and not future.done():
+                future.set_result(receipt)
+
+    def scan(self):
+        block_number = self.web3.eth.block_number
+
+        # Txs sent before the watcher followed any block may be mined already, in a block below the head
+        if self.last_block is None:
+            self.last_block = block_number
+            with self.lock:
+                pending = list(self.pending)
+            self.lookup(pending)
+
+        for number in range(self.last_block + 1, block_number + 1):
+            block = self.web3.eth.get_block(number)
+            hashes = {HexBytes(tx_hash).hex() for tx_hash in block["transactions"]}
+
+            with self.lock:
+                self.recent.append(hashes)
+                included = [tx_hash for tx_hash in self.pending if tx_hash in hashes]
+
+            self.resolve(included)
+            self.last_block = number
+
+        self.scans += 1
+        with self.lock:
+            stale = [tx_hash for tx_hash, scan in self.unseen.items() if self.scans - scan > self.LOOKUP_AFTER_SCANS]
+            for tx_hash in stale:
+                del self.unseen[tx_hash]
+        self.lookup(stale)
+
+    def run(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.thread = None
+                    self.last_block = None  # Catching up on idle blocks costs more than one lookup per tx
+                    return
+
+            try:
+                self.scan()
+            except Exception as error:
+                logger.debug(f"Receipt watcher {self.chain}: {error}")
+
+            time.sleep(settings.BLOCK_POLL_INTERVAL)
+
+
+_lock = threading.Lock()
+_watchers = {}
+
+
+def get_receipt_watcher(chain):
+    """Returns the receipt watcher shared by every wallet on a chain"""
+    with _lock:
+        if chain not in _watchers:
+            _watchers[chain] = ReceiptWatcher(chain)
+
+    return _watchers[chain]
@@ -0,0 +1,184 @@
+import atexit
+import csv
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import settings
+from modules.config import logger
+
+REPORTS_DIR = "reports"
+
+
+class ReportWriter:
+    """
+    Buffered sink of one report, safe to share between threads and coroutines.
+
+    Rows are kept in memory and flushed once REPORT_FLUSH_ROWS are waiting, every REPORT_FLUSH_INTERVAL
+    seconds and at exit. A flush appends the rows to the CSV in one write, and stores them in a table of
+    reports.db named after the report, with the headers as columns and an index on the wallet.
+    The first column of a row is the wallet.
+    """
+
+    def __init__(self, name, headers):
+        self.name = name
+        self.headers = headers
+        self.path = os.path.join(REPORTS_DIR, f"{name}.csv")
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.rows = []
+
+    def add(self, *rows):
+        with self.lock:
+            self.rows.extend(rows)
+            full = len(self.rows) >= settings.REPORT_FLUSH_ROWS
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                rows, self.rows = self.rows, []
+
+            if not rows:
+                return
+
+            try:
+                if _forward:
+                    _forward(self.name, self.headers, rows)
+                else:
+                    self.write_csv(rows)
+                    get_report_db().insert(self.name, self.headers, rows)
+
+            except Exception as error:
+                logger.error(f"Failed to write {self.path}: {error}")
+                with self.lock:
+                    self.rows[:0] = rows  # Keep them for the next flush
+
+    def write_csv(self, rows):
+        """Appends the rows, called under `flush_lock` so flushes of a report never interleave"""
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+        buffer = io.StringIO()
+        if not exists:
+            csv.writer(buffer).writerow(self.headers)
+        csv.writer(buffer).writerows(rows)
+
+        with open(self.path, "a", encoding="utf-8", newline="") as file:
+            file.write(buffer.getvalue())
+            file.flush()
+            os.fsync(file.fileno())
+
+        if not exists:
+            logger.success(f"{self.path} created")
+
+
+def quote(name):
+    """SQLite identifier, report names and headers have dashes and spaces"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def get_columns(headers):
+    """Column names of a report, a repeated header gets numbered as SQLite wants them unique whatever the case"""
+    seen = Counter()
+    columns = []
+    for header in headers:
+        seen[header.lower()] += 1
+        columns.append(header if seen[header.lower()] == 1 else f"{header} {seen[header.lower()]}")
+    return columns
+
+
+class ReportDb:
+    """
+    SQLite copy of every report: one table per report, named like its CSV, with the headers as columns
+    plus `created_at`. The first column, the wallet, is indexed.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.tables = set()
+
+    def create_table(self, report, headers):
+        # Addresses are looked up whatever their checksum casing
+        wallet, *columns = [quote(column) for column in get_columns(headers)]
+        columns = ", ".join([f"{wallet} COLLATE NOCASE", *columns, "created_at REAL"])
+
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS {quote(report)} ({columns})")
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS {quote(report + '_wallet')} ON {quote(report)} ({wallet})")
+        self.tables.add(report)
+
+    def insert(self, report, headers, rows):
+        now = time.time()
+
+        with self.lock, self.db:
+            if report not in self.tables:
+                self.create_table(report, headers)
+
+            self.db.executemany(
+                f"INSERT INTO {quote(report)} VALUES ({', '.join('?' * (len(headers) + 1))})",
+                [(*row, now) for row in rows],
+            )
+
+
+_writers = {}
+_report_db = None
+_lock = threading.Lock()
+_thread = None
+_forward = None
+
+
+def get_report_db():
+    global _report_db
+
+    if _report_db is None:
+        with _lock:
+            if _report_db is None:
+                _report_db = ReportDb(os.path.join(REPORTS_DIR, "reports.db"))
+
+    return _report_db
+
+
+def get_report_writer(name, headers):
+    """Returns the shared writer of `reports/<name>.csv`, starting the periodic flush on first use"""
+    global _thread
+
+    with _lock:
+        if name not in _writers:
+            _writers[name] = ReportWriter(name, headers)
+
+        if not _thread:
+            _thread = threading.Thread(target=run_flusher, name="reports", daemon=True)
+            _thread.start()
+
+        return _writers[name]
+
+
+def forward_reports(send):
+    """Flushes hand the rows to `send(name, headers, rows)` instead of writing them, see models/shards.py"""
+    global _forward
+    _forward = send
+
+
+def flush_reports():
+    with _lock:
+        writers = list(_writers.values())
+
+    for writer in writers:
+        writer.flush()
+
+
+def run_flusher():
+    while True:
+        time.sleep(settings.REPORT_FLUSH_INTERVAL)
+        flush_reports()
+
+
+atexit.register(flush_reports)
@@ -0,0 +1,96 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import settings
+from modules.config import CACHE_DIR
+
+
+class ResponseCache:
+    """
+    TTL cache of one API client's GET responses.
+
+    Entries live in memory for API_CACHE_TTL seconds and are dropped by `clear()` whenever the client
+    changes state on the server. Near-static data can be kept on disk with `persist=True`, where it
+    survives restarts for API_DISK_CACHE_TTL seconds and is not touched by `clear()`.
+    """
+
+    def __init__(self, owner):
+        self.owner = owner.lower()
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    @staticmethod
+    def get_key(endpoint, params=None):
+        return f"{endpoint}?{json.dumps(params, sort_keys=True)}" if params else endpoint
+
+    def get(self, key, persist=False):
+        with self.lock:
+            value, expires_at = self.entries.get(key, (None, 0))
+
+        if expires_at > time.time():
+            return value
+
+        if persist:
+            return get_disk_cache().get(self.owner, key)
+
+    def set(self, key, value, persist=False):
+        with self.lock:
+            self.entries[key] = (value, time.time() + settings.API_CACHE_TTL)
+
+        if persist:
+            get_disk_cache().set(self.owner, key, value, settings.API_DISK_CACHE_TTL)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class DiskCache:
+    """SQLite tier of `ResponseCache`, shared by every client and kept across runs"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "owner TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (owner, key))"
+        )
+        self.db.commit()
+
+    def get(self, owner, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value FROM responses WHERE owner = ? AND key = ? AND expires_at > ?",
+                (owner, key, time.time()),
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def set(self, owner, key, value, ttl):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (owner, key, json.dumps(value), time.time() + ttl),
+            )
+            self.db.commit()
+
+
+_disk_cache = None
+_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """Returns the process-wide disk response cache, opening it on first use"""
+    global _disk_cache
+
+    if _disk_cache is None:
+        with _lock:
+            if _disk_cache is None:
+                _disk_cache = DiskCache(os.path.join(CACHE_DIR, "responses.db"))
+
+    return _disk_cache
@@ -0,0 +1,87 @@
+import time
+
+from hexbytes import HexBytes
+
+import settings
+from models.metrics import observe_rpc_request
+from models.provider import get_session
+from modules.config import CHAIN_DATA
+
+
+class RpcBatch:
+    """
+    Collects JSON-RPC reads for one chain and sends them as batch POSTs of RPC_BATCH_SIZE requests.
+
+    Usage:
+        batch = RpcBatch("bitlayer")
+        balance = batch.get_balance(address)
+        nonce = batch.get_transaction_count(address)
+        results = batch.execute()
+        results[balance], results[nonce]
+    """
+
+    def __init__(self, chain="bitlayer", batch_size=None):
+        self.chain = chain
+        self.rpc = CHAIN_DATA[chain]["rpc"]
+        self.batch_size = batch_size or settings.RPC_BATCH_SIZE
+        self.requests = []
+        self.formatters = []
+
+    def __len__(self):
+        return len(self.requests)
+
+    def add(self, method, params, formatter=None):
+        """Queues a request and returns its position in the `execute()` results"""
+        self.requests.append({"jsonrpc": "2.0", "id": len(self.requests), "method": method, "params": params})
+        self.formatters.append(formatter)
+        return len(self.requests) - 1
+
+    def get_balance(self, address, block="latest"):
+        return self.add("eth_getBalance", [address, block], formatter=lambda value: int(value, 16))
+
+    def get_transaction_count(self, address, block="latest"):
+        return self.add("eth_getTransactionCount", [address, block], formatter=lambda value: int(value, 16))
+
+    def call(self, tx, block="latest"):
+        return self.add("eth_call", [tx, block], formatter=HexBytes)
+
+    def execute(self):
+        """Sends all queued requests and returns their results in the order they were added"""
+        session = get_session()
+        results = [None] * len(self.requests)
+
+        for start in range(0, len(self.requests), self.batch_size):
+            chunk = self.requests[start : start + self.batch_size]
+            started_at = time.perf_counter()
+            data = None
+
+            try:
+                response = session.post(self.rpc, json=chunk, timeout=60)
+                response.raise_for_status()
+                data = response.json()
+            finally:
+                observe_rpc_request(self.chain, "batch", data is not None, time.perf_counter() - started_at)
+
+            # Some nodes answer a rejected batch with a single error object
+            if not isinstance(data, list):
+                raise Exception(f"Batch request failed: {data}")
+
+            for item in data:
+                if "error" in item:
+                    request = self.requests[item["id"]]
+                    raise Exception(f"{request['method']} {request['params']} failed: {item['error']}")
+
+                formatter = self.formatters[item["id"]]
+                results[item["id"]] = formatter(item["result"]) if formatter else item["result"]
+
+        self.requests, self.formatters = [], []
+        return results
+
+
+def get_accounts_state(addresses, chain="bitlayer"):
+    """Returns {address: (balance, tx_count)} for many addresses using batched requests"""
+    batch = RpcBatch(chain)
+    handles = {address: (batch.get_balance(address), batch.get_transaction_count(address)) for address in addresses}
+    results = batch.execute()
+
+    return {address: (results[balance], results[tx_count]) for address, (balance, tx_count) in handles.items()}
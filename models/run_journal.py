@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from models.identity import get_identity
+from modules.config import CACHE_DIR
+
+
+class RunJournal:
+    """
+    On-disk journal of wallet runs, one row per (run, wallet).
+
+    A run stays open until every wallet went through it. Starting the same action again while its last
+    run is open resumes that run, and wallets already recorded as done there are skipped. Runs are
+    resumed on the UTC day they started only, the daily claims and check-ins are due again the day after.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT, started_at REAL, finished_at REAL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS wallets ("
+            "run_id INTEGER, action TEXT, wallet TEXT, status TEXT, updated_at REAL, PRIMARY KEY (run_id, wallet))"
+        )
+        self.db.commit()
+
+    def start_run(self, action, force=False):
+        """Returns the open run of an action or a new one, `force` closes the open run and starts over"""
+        now = time.time()
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+        with self.lock:
+            # Open runs of the days before are over, whatever was left of them
+            self.db.execute(
+                "UPDATE runs SET finished_at = ? WHERE action = ? AND finished_at IS NULL AND started_at < ?",
+                (now, action, today),
+            )
+
+            row = self.db.execute(
+                "SELECT run_id FROM runs WHERE action = ? AND finished_at IS NULL ORDER BY run_id DESC LIMIT 1",
+                (action,),
+            ).fetchone()
+
+            if row and force:
+                self.db.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (now, row[0]))
+                row = None
+
+            if row:
+                run_id = row[0]
+            else:
+                run_id = self.db.execute(
+                    "INSERT INTO runs (action, started_at) VALUES (?, ?)", (action, now)
+                ).lastrowid
+
+            self.db.commit()
+
+        return self.get_run(run_id, action)
+
+    def get_run(self, run_id, action):
+        """Returns a run started elsewhere, e.g. by the parent of a shard process"""
+        with self.lock:
+            done = self.db.execute(
+                "SELECT wallet FROM wallets WHERE run_id = ? AND status = 'done'", (run_id,)
+            ).fetchall()
+
+        return Run(self, run_id, action, {wallet for wallet, in done})
+
+    def record(self, run_id, action, wallet, status):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO wallets VALUES (?, ?, ?, ?, ?)",
+                (run_id, action, wallet, status, time.time()),
+            )
+            self.db.commit()
+
+    def finish_run(self, run_id):
+        with self.lock:
+            self.db.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+            self.db.commit()
+
+
+class Run:
+    """One run of an action, records wallet outcomes as they happen"""
+
+    def __init__(self, journal, run_id, action, done):
+        self.journal = journal
+        self.run_id = run_id
+        self.action = action
+        self.done = done
+
+    @staticmethod
+    def get_wallet(key):
+        return get_identity(key).wallet
+
+    def is_done(self, key):
+        return self.get_wallet(key) in self.done
+
+    def record(self, key, status):
+        """Saves the outcome of a wallet: "done" is skipped on resume, anything else runs again"""
+        wallet = self.get_wallet(key)
+        self.journal.record(self.run_id, self.action, wallet, status)
+
+        if status == "done":
+            self.done.add(wallet)
+
+    def finish(self):
+        self.journal.finish_run(self.run_id)
+
+
+_run_journal = None
+_lock = threading.Lock()
+
+
+def get_run_journal():
+    """Returns the process-wide run journal, opening it on first use"""
+    global _run_journal
+
+    if _run_journal is None:
+        with _lock:
+            if _run_journal is None:
+                _run_journal = RunJournal(os.path.join(CACHE_DIR, "journal.db"))
+
+    return _run_journal
@@ -0,0 +1,80 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import settings
+from modules.config import CACHE_DIR
+
+
+class SessionStore:
+    """
+    On-disk store of logged-in API sessions, one per address.
+
+    A session holds the auth cookies and the User-Agent they were issued to. It expires at the earliest
+    cookie expiry, or SESSION_TTL seconds after login when the site sets none.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "address TEXT PRIMARY KEY, cookies TEXT, user_agent TEXT, expires_at REAL)"
+        )
+        self.db.commit()
+
+    def get(self, address):
+        """Returns the saved session of an address or None when there is no valid one"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT cookies, user_agent, expires_at FROM sessions WHERE address = ?", (address.lower(),)
+            ).fetchone()
+
+        if not row or row[2] <= time.time():
+            return None
+
+        cookies, user_agent, expires_at = row
+        return {"cookies": json.loads(cookies), "user_agent": user_agent, "expires_at": expires_at}
+
+    def set(self, address, cookies, user_agent, expires=None):
+        """
+        Saves a session.
+
+        Args:
+            cookies: {name: value} of the session cookies
+            expires: unix timestamps of the cookie expiries, None entries are session cookies
+        """
+        expires = [timestamp for timestamp in expires or [] if timestamp]
+        expires_at = min(expires) if expires else time.time() + settings.SESSION_TTL
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (address.lower(), json.dumps(cookies), user_agent, expires_at),
+            )
+            self.db.commit()
+
+    def delete(self, address):
+        with self.lock:
+            self.db.execute("DELETE FROM sessions WHERE address = ?", (address.lower(),))
+            self.db.commit()
+
+
+_session_store = None
+_lock = threading.Lock()
+
+
+def get_session_store():
+    """Returns the process-wide session store, opening it on first use"""
+    global _session_store
+
+    if _session_store is None:
+        with _lock:
+            if _session_store is None:
+                _session_store = SessionStore(os.path.join(CACHE_DIR, "sessions.db"))
+
+    return _session_store
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import Counter
+from queue import Empty
+
+from models import report_writer
+from models.report_writer import get_report_writer
+from modules.config import logger
+
+# Seconds between the progress lines of the parent process
+PROGRESS_INTERVAL = 30
+
+# Queue to the parent process, set in every shard process by `init_shard_worker`
+_queue = None
+
+
+def split_shards(keys, proxies, recipients, workers):
+    """
+    Splits the wallets into at most `workers` disjoint shards of (keys, proxies, recipients).
+
+    Wallets sharing a proxy land in the same shard, so no proxy is used by two processes. Every wallet
+    keeps the recipient `run_wallet` would pick for it by its keys.txt index.
+    """
+    if proxies:
+        wallets = Counter(proxies)
+        if len(wallets) < workers:
+            logger.warning(f"Only {len(wallets)} distinct proxies, running {len(wallets)} workers")
+            workers = len(wallets)
+
+        # Biggest proxy groups first, each to the shard with the fewest wallets so far
+        loads = [0] * workers
+        proxy_shards = {}
+        for proxy, count in wallets.most_common():
+            proxy_shards[proxy] = loads.index(min(loads))
+            loads[proxy_shards[proxy]] += count
+
+    shards = [([], [], []) for _ in range(workers)]
+
+    for position, key in enumerate(keys):
+        shard = proxy_shards[proxies[position]] if proxies else position % workers
+        shard_keys, shard_proxies, shard_recipients = shards[shard]
+        shard_keys.append(key)
+
+        if proxies:
+            shard_proxies.append(proxies[position])
+        if recipients:
+            shard_recipients.append(recipients[position % len(recipients)])
+
+    return [shard for shard in shards if shard[0]]
+
+
+def init_shard_worker(queue):
+    global _queue
+    _queue = queue
+
+
+def connect_shard(shard):
+    """Sends the logs and report rows of this process to the parent instead of writing them"""
+    logger.remove()
+    logger.add(
+        lambda message: _queue.put(("log", shard, message.record["level"].name, message.record["message"])),
+        format="{message}",
+    )
+    report_writer.forward_reports(lambda name, headers, rows: _queue.put(("report", name, headers, rows)))
+
+
+class ShardRun:
+    """
+    `Run` of a shard process: outcomes go to the shared journal and to the parent's progress.
+
+    `finish()` is left to the parent, the run is only over once every shard went through.
+    """
+
+    def __init__(self, run, shard):
+        self.run = run
+        self.run_id = run.run_id
+        self.shard = shard
+
+    def is_done(self, key):
+        return self.run.is_done(key)
+
+    def record(self, key, status):
+        self.run.record(key, status)
+        _queue.put(("wallet", self.shard, status))
+
+    def finish(self):
+        pass
+
+
+class ShardMonitor:
+    """
+    Parent side of the shard processes.
+
+    Re-logs their lines tagged with the worker, writes their report rows through the shared report
+    writers and logs the progress of every shard each PROGRESS_INTERVAL seconds.
+    """
+
+    def __init__(self, queue, shards, run):
+        self.queue = queue
+        self.totals = [len(keys) for keys, _, _ in shards]
+        self.done = [sum(run.is_done(key) for key in keys) for keys, _, _ in shards]
+        self.failed = [0] * len(shards)
+        self.thread = threading.Thread(target=self.run, name="shards", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Handles whatever the shards sent until now and stops, call once every shard process exited"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        logged_at = time.monotonic()
+
+        while True:
+            try:
+                message = self.queue.get(timeout=PROGRESS_INTERVAL)
+            except Empty:
+                message = ()
+
+            if message is None:
+                return
+            if message:
+                self.handle(*message)
+
+            if time.monotonic() - logged_at >= PROGRESS_INTERVAL:
+                self.log_progress()
+                logged_at = time.monotonic()
+
+    def handle(self, kind, *data):
+        if kind == "log":
+            shard, level, text = data
+            logger.log(level, f"[w{shard + 1}] {text}")
+
+        elif kind == "report":
+            name, headers, rows = data
+            get_report_writer(name, headers).add(*rows)
+
+        elif kind == "wallet":
+            shard, status = data
+            if status == "done":
+                self.done[shard] += 1
+            else:
+                self.failed[shard] += 1
+
+    def get_progress(self, shard):
+        progress = f"w{shard + 1} {self.done[shard] + self.failed[shard]}/{self.totals[shard]}"
+        return f"{progress} ({self.failed[shard]} failed)" if self.failed[shard] else progress
+
+    def log_progress(self):
+        logger.info(f"Workers: {' | '.join(self.get_progress(shard) for shard in range(len(self.totals)))}")
@@ -0,0 +1,336 @@
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import settings
+from models.identity import get_identity
+from modules.config import CACHE_DIR, logger
+
+# Seconds a worker waits while other workers hold every open job, the coordinator checks the queue as often
+IDLE_WAIT = 10
+
+# Fields of the coordinator API and their types
+API_FIELDS = {"worker": str, "count": int, "job_ids": list, "job_id": int, "status": str}
+
+
+class WorkQueue:
+    """
+    Durable queue of (action, wallet) jobs shared by the workers of several hosts.
+
+    A worker leases jobs for QUEUE_LEASE_TTL seconds and keeps renewing the lease while it runs them.
+    A lease that runs out is handed to the next worker, so jobs of a crashed worker are retried, and a
+    worker only records an outcome while its lease holds. A wallet is never leased twice at a time, not
+    even for two different actions. Failed jobs go back to the queue until QUEUE_MAX_ATTEMPTS.
+
+    Only addresses are queued, workers look the keys up in their own keys.txt.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.lock = threading.Lock()
+        # Transactions are explicit, BEGIN IMMEDIATE keeps a lease atomic between processes on one file
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT, wallet TEXT, wallet_index INTEGER, "
+            "status TEXT, worker TEXT, lease_until REAL, attempts INTEGER, updated_at REAL, UNIQUE (action, wallet))"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, wallet)")
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction taken before any read, so two leases never interleave"""
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def load(self, actions, keys, force=False):
+        """
+        Queues every action for every wallet. Jobs already done are kept unless `force`, failed ones
+        are queued again, so loading the same actions twice resumes them.
+        """
+        wallets = [get_identity(key).wallet for key in keys]
+        now = time.time()
+
+        with self.transaction():
+            for action in actions:
+                if force:
+                    self.db.execute("DELETE FROM jobs WHERE action = ?", (action,))
+
+                self.db.execute(
+                    "UPDATE jobs SET status = 'pending', attempts = 0, updated_at = ? "
+                    "WHERE action = ? AND status = 'failed'",
+                    (now, action),
+                )
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO jobs (action, wallet, wallet_index, status, attempts, updated_at) "
+                    "VALUES (?, ?, ?, 'pending', 0, ?)",
+                    [(action, wallet, index, now) for index, wallet in enumerate(wallets, start=1)],
+                )
+
+    def lease(self, worker, count):
+        """Leases up to `count` jobs of distinct wallets, returns them as dicts in queue order"""
+        now = time.time()
+
+        with self.transaction():
+            self.db.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, now, settings.QUEUE_MAX_ATTEMPTS),
+            )
+
+            rows = self.db.execute(
+                "SELECT job_id, action, wallet, wallet_index, status, worker FROM jobs "
+                "WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?)) "
+                "AND wallet NOT IN (SELECT wallet FROM jobs WHERE status = 'leased' AND lease_until >= ?) "
+                "ORDER BY job_id LIMIT ?",
+                (now, now, count * 10),
+            ).fetchall()
+
+            jobs, wallets = [], set()
+            for job_id, action, wallet, index, status, previous in rows:
+                if wallet in wallets or len(jobs) == count:
+                    continue
+                if status == "leased":
+                    logger.warning(f"Lease of {wallet} ({action}) by {previous} ran out, retrying it")
+
+                wallets.add(wallet)
+                jobs.append({"job_id": job_id, "action": action, "wallet": wallet, "index": index})
+
+            self.db.executemany(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE job_id = ?",
+                [(worker, now + settings.QUEUE_LEASE_TTL, now, job["job_id"]) for job in jobs],
+            )
+
+        return jobs
+
+    def renew(self, worker, job_ids):
+        """Extends the leases the worker still holds, returns their job ids"""
+        now = time.time()
+        renewed = []
+
+        with self.transaction():
+            for job_id in job_ids:
+                cursor = self.db.execute(
+                    "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND worker = ? AND status = 'leased'",
+                    (now + settings.QUEUE_LEASE_TTL, job_id, worker),
+                )
+                if cursor.rowcount:
+                    renewed.append(job_id)
+
+        return renewed
+
+    def complete(self, worker, job_id, status):
+        """
+        Records the outcome of a leased job, False if the worker lost the lease in the meantime.
+        A failed job is queued again while it has attempts left.
+        """
+        with self.transaction():
+            cursor = self.db.execute(
+                "UPDATE jobs SET status = CASE WHEN ? = 'failed' AND attempts < ? THEN 'pending' ELSE ? END, "
+                "worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE job_id = ? AND worker = ? AND status = 'leased'",
+                (status, settings.QUEUE_MAX_ATTEMPTS, status, time.time(), job_id, worker),
+            )
+
+        return bool(cursor.rowcount)
+
+    def get_counts(self):
+        """{status: jobs}"""
+        with self.lock:
+            return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class WorkQueueHandler(BaseHTTPRequestHandler):
+    """JSON API of the coordinator, every call is a `WorkQueue` method"""
+
+    def read_body(self):
+        """The JSON object sent, ValueError when it is not one or a field has the wrong type"""
+        length = int(self.headers.get("Content-Length", 0))
+        if length < 0:
+            raise ValueError(f"Content-Length {length}")
+
+        body = json.loads(self.rfile.read(length) or "{}")
+        if not isinstance(body, dict):
+            raise ValueError("Body is not an object")
+
+        for key, kind in API_FIELDS.items():
+            if key in body and not isinstance(body[key], kind):
+                raise ValueError(f"{key} is not a {kind.__name__}")
+        if not all(isinstance(job_id, int) for job_id in body.get("job_ids", [])):
+            raise ValueError("job_ids are not ints")
+
+        return body
+
+    def do_POST(self):
+        if settings.QUEUE_TOKEN and self.headers.get("Authorization") != f"Bearer {settings.QUEUE_TOKEN}":
+            self.send_error(401)
+            return
+
+        queue = self.server.queue
+
+        try:
+            body = self.read_body()
+
+            if self.path == "/lease":
+                result = queue.lease(body["worker"], body["count"])
+            elif self.path == "/renew":
+                result = queue.renew(body["worker"], body["job_ids"])
+            elif self.path == "/complete":
+                result = queue.complete(body["worker"], body["job_id"], body["status"])
+            elif self.path == "/counts":
+                result = queue.get_counts()
+            else:
+                self.send_error(404)
+                return
+
+        # Malformed body or a missing field
+        except (ValueError, KeyError):
+            self.send_error(400)
+            return
+
+        data = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def is_loopback(host):
+    """Whether only this host can reach `host`, a bind address of the coordinator"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def start_work_queue_server(queue, host, port):
+    """Serves the queue to the workers from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), WorkQueueHandler)
+    server.queue = queue
+    threading.Thread(target=server.serve_forever, name="work-queue", daemon=True).start()
+    logger.info(f"Coordinator on http://{host}:{port}, start the workers with --worker")
+    return server
+
+
+class WorkQueueClient:
+    """`WorkQueue` of a coordinator on another host, same methods"""
+
+    TIMEOUT = 30
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        if settings.QUEUE_TOKEN:
+            self.session.headers["Authorization"] = f"Bearer {settings.QUEUE_TOKEN}"
+
+    def call(self, path, **body):
+        response = self.session.post(f"{self.url}{path}", json=body, timeout=self.TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def lease(self, worker, count):
+        return self.call("/lease", worker=worker, count=count)
+
+    def renew(self, worker, job_ids):
+        return self.call("/renew", worker=worker, job_ids=job_ids)
+
+    def complete(self, worker, job_id, status):
+        return self.call("/complete", worker=worker, job_id=job_id, status=status)
+
+    def get_counts(self):
+        return self.call("/counts")
+
+
+def open_work_queue(location):
+    """A coordinator URL or the path of a queue file on this host"""
+    if location.startswith(("http://", "https://")):
+        return WorkQueueClient(location)
+    return WorkQueue(location)
+
+
+def get_work_queue():
+    """The coordinator's own queue"""
+    return WorkQueue(os.path.join(CACHE_DIR, "queue.db"))
+
+
+def get_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseKeeper:
+    """Renews the leases of a worker every third of QUEUE_LEASE_TTL until their jobs are completed"""
+
+    def __init__(self, queue, worker):
+        self.queue = queue
+        self.worker = worker
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="leases", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def add(self, jobs):
+        with self.lock:
+            self.jobs.update({job["job_id"]: job for job in jobs})
+
+    def complete(self, job, status):
+        with self.lock:
+            self.jobs.pop(job["job_id"], None)
+
+        if not self.queue.complete(self.worker, job["job_id"], status):
+            logger.warning(f"Lease of {job['wallet']} ({job['action']}) ran out before it was done, not recorded")
+
+    def run(self):
+        while True:
+            time.sleep(settings.QUEUE_LEASE_TTL / 3)
+
+            with self.lock:
+                jobs = dict(self.jobs)
+            if not jobs:
+                continue
+
+            try:
+                renewed = set(self.queue.renew(self.worker, list(jobs)))
+            except Exception as error:
+                logger.warning(f"Failed to renew leases: {error}")
+                continue
+
+            for job_id, job in jobs.items():
+                if job_id not in renewed:
+                    logger.warning(f"Lost the lease of {job['wallet']} ({job['action']})")
+
+
+class JobRun:
+    """`Run` of a batch of leased jobs of one action, outcomes go back to the queue"""
+
+    def __init__(self, keeper, jobs):
+        self.keeper = keeper
+        self.jobs = jobs
+
+    def record(self, key, status):
+        self.keeper.complete(self.jobs[key], status)
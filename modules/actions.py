@@ -4,16 +4,20 @@ from rich import print as rich_print
 from rich.text import Text
 
 import settings
+from models.multicall import get_token_balances
+from models.proxy_pool import ProxyPool
+from models.rpc_batch import get_accounts_state
 from models.wallet import Wallet
 from modules.avalon import Avalon
 from modules.bitcow import BitCow
 from modules.bitlayer import Bitlayer
-from modules.config import logger
+from modules.config import WBTC, logger
 from modules.gaszip import GasZip, GasZipHelper
 from modules.layerbank import LayerBank
 from modules.minibridge import MiniBridge, MiniBridgeHelper
 from modules.owlto import Owlto
-from modules.utils import create_csv, get_btc_price, get_rand_amount, random_sleep
+from modules.polling import poll
+from modules.utils import create_csv, get_btc_price, get_rand_amount
 from modules.wrapper import Wrapper
 
 
@@ -28,6 +32,7 @@ class ActionHandler:
         self.keys = keys
         self.proxies = proxies
         self.recipients = recipients
+        self.proxy_pool = ProxyPool(proxies, keys)
 
     def get_action_map(self):
         return {
@@ -51,43 +56,51 @@ class ActionHandler:
         }
 
     def get_proxy(self, index):
-        """Assigns a proxy to a wallet based on its index"""
-        if settings.USE_PROXY and self.proxies:
-            # Zero-based index for proxy list
-            proxy_index = (index - 1) % len(self.proxies)
-            return self.proxies[proxy_index]
+        """Returns the wallet's sticky proxy from the pool, a healthy one if its own is out of rotation"""
+        if settings.USE_PROXY:
+            return self.proxy_pool.get(self.keys[index - 1])
         return None
 
+    def lock_proxy(self, index):
+        """Holds a session slot on the wallet's proxy, so at most MAX_SESSIONS_PER_PROXY wallets share it"""
+        return self.proxy_pool.lease(self.keys[index - 1])
+
     def parse_accounts(self):
         logger.info(f"Parsing {len(self.keys)} accounts and their transaction counts...\n")
 
+        addresses = [Wallet(key, None).address for key in self.keys]
+        accounts_state = get_accounts_state(addresses)
+        wbtc_balances = get_token_balances(WBTC, addresses)
+        btc_price = get_btc_price()
+
         wallets_data = []
-        for index, key in enumerate(self.keys, start=1):
-            wallet = Wallet(key, None)
-            balance = f"{wallet.get_balance() / 10**18:.8f}"
-            balance_usd = round((wallet.get_balance() / 10**18) * get_btc_price(), 2)
+        for index, address in enumerate(addresses, start=1):
+            balance_wei, tx_count = accounts_state[address]
+            balance = f"{balance_wei / 10**18:.8f}"
+            balance_usd = round((balance_wei / 10**18) * btc_price, 2)
+            wbtc_balance = f"{(wbtc_balances[address] or 0) / 10**18:.8f}"
             index_str = f"{index}".zfill(2) if index < 10 else str(index)
 
             # Determine style based on transaction count
-            if wallet.tx_count >= 100:
+            if tx_count >= 100:
                 style = "green"
-            elif wallet.tx_count >= 50:
+            elif tx_count >= 50:
                 style = "yellow"
             else:
                 style = None
 
             text = Text(
-                f"{index_str} {wallet.address}: {wallet.tx_count} txn: {balance} BTC, {balance_usd} USD",
+                f"{index_str} {address}: {tx_count} txn: {balance} BTC, {balance_usd} USD, {wbtc_balance} WBTC",
                 style=style,
             )
 
             rich_print(text)
-            wallets_data.append((index, wallet.address, wallet.tx_count, balance, balance_usd))
+            wallets_data.append((index, address, tx_count, balance, balance_usd, wbtc_balance))
 
         create_csv(
             "reports/tx_count.csv",
             "w",
-            ["№", "Wallet", "TX count", "BTC balance", "USD"],
+            ["№", "Wallet", "TX count", "BTC balance", "USD", "WBTC balance"],
             wallets_data,
         )
 
@@ -131,12 +144,17 @@ class ActionHandler:
 
         tx_count = random.randint(*settings.WRAP_TX_COUNT)
 
+        if settings.PIPELINE_TXS:
+            amounts = [random.uniform(*settings.WRAP_VALUE) for _ in range(tx_count)]
+            wrapper.batch_deposit(amounts)
+            return True
+
         for _ in range(tx_count):
             rand_amount = random.uniform(*settings.WRAP_VALUE)
             tx_status = wrapper.deposit(rand_amount)
 
             if tx_status:
-                random_sleep(*settings.SLEEP_BETWEEN_ACTIONS)
+                wrapper.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
 
         return True
 
@@ -220,12 +238,16 @@ class ActionHandler:
         proxy = self.get_proxy(index)
         bitlayer = Bitlayer(key, f"[{index}/{total}]", proxy)
 
-        if bitlayer.get_balance() / 10**18 <= 0.00000223:
-            self.gaszip(key, index, total)
-            random_sleep(10, 15)
+        if bitlayer.get_balance() / 10**18 <= 0.00000223 and self.gaszip(key, index, total):
+            # The claim estimates its gas, so the bridged BTC has to be there first
+            poll(
+                lambda: True if bitlayer.get_balance() / 10**18 > 0.00000223 else None,
+                timeout=300,
+                label=f"{bitlayer.label} GasZip deposit",
+            )
 
         tx_status = bitlayer.claim_airdrop()
-        random_sleep(10, 15)
+        bitlayer.cooldown.defer(10, 15)
 
         if settings.SEND_TO_EXCHANGE:
             bitlayer.send_btr_to_exchange(recipient)
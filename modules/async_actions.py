@@ -0,0 +1,164 @@
+import asyncio
+import random
+
+import settings
+from models.proxy_pool import AsyncProxyPool
+from modules.actions import ActionHandler
+from modules.avalon import AsyncAvalon
+from modules.bitcow import AsyncBitCow
+from modules.bitlayer import AsyncBitlayer
+from modules.config import logger
+from modules.gaszip import AsyncGasZip, AsyncGasZipHelper
+from modules.layerbank import AsyncLayerBank
+from modules.minibridge import AsyncMiniBridge, AsyncMiniBridgeHelper
+from modules.owlto import AsyncOwlto
+from modules.polling import async_poll
+from modules.utils import get_rand_amount
+from modules.wrapper import AsyncWrapper
+
+
+class AsyncActionHandler(ActionHandler):
+    """
+    Awaitable twin of `ActionHandler`, every action in the map is a coroutine function.
+    """
+
+    def __init__(self, keys, proxies, recipients):
+        super().__init__(keys, proxies, recipients)
+        self.proxy_pool = AsyncProxyPool(proxies, keys)
+
+    async def parse_accounts(self):
+        """Batched reads and a CSV, the sync version runs off the event loop"""
+        await asyncio.to_thread(super().parse_accounts)
+
+    async def lucky_draw(self, key, index, total):
+        proxy = self.get_proxy(index)
+        async with AsyncBitlayer(key, f"[{index}/{total}]", proxy) as bitlayer:
+            status = await bitlayer.get_draw()
+
+            if status:
+                return await bitlayer.assemble_cars()
+
+    async def assemble_car(self, key, index, total):
+        proxy = self.get_proxy(index)
+        async with AsyncBitlayer(key, f"[{index}/{total}]", proxy) as bitlayer:
+            return await bitlayer.assemble_cars()
+
+    async def claim_daily_tasks(self, key, index, total):
+        proxy = self.get_proxy(index)
+        async with AsyncBitlayer(key, f"[{index}/{total}]", proxy) as bitlayer:
+            return await bitlayer.claim_daily_tasks()
+
+    async def claim_advanced_tasks(self, key, index, total):
+        proxy = self.get_proxy(index)
+        async with AsyncBitlayer(key, f"[{index}/{total}]", proxy) as bitlayer:
+            return await bitlayer.claim_txn_tasks()
+
+    async def wrap_btc(self, key, index, total):
+        wrapper = AsyncWrapper(key, f"[{index}/{total}]")
+
+        # Check for sufficient balance
+        balance = await wrapper.get_balance()
+        min_balance = wrapper.web3.to_wei(settings.MIN_BTC_BALANCE, "ether")
+
+        if balance < min_balance:
+            logger.warning(
+                f"{wrapper.label} Current balance is under {settings.MIN_BTC_BALANCE:.8f} BTC, will attempt to redeem BTC instead"
+            )
+            return await wrapper.withdraw()
+
+        tx_count = random.randint(*settings.WRAP_TX_COUNT)
+
+        if settings.PIPELINE_TXS:
+            amounts = [random.uniform(*settings.WRAP_VALUE) for _ in range(tx_count)]
+            await wrapper.batch_deposit(amounts)
+            return True
+
+        for _ in range(tx_count):
+            rand_amount = random.uniform(*settings.WRAP_VALUE)
+            tx_status = await wrapper.deposit(rand_amount)
+
+            if tx_status:
+                wrapper.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
+
+        return True
+
+    async def unwrap_wbtc(self, key, index, total):
+        wrapper = AsyncWrapper(key, f"[{index}/{total}]")
+
+        return await wrapper.withdraw()
+
+    async def swap_btc(self, key, index, total, to_token):
+        bitcow = AsyncBitCow(key, f"[{index}/{total}]")
+        amount = get_rand_amount(*settings.SWAP_VALUES)
+        rand_percentage = random.randint(*settings.SWAP_BACK_VALUES)
+
+        return await bitcow.swap(to_token, amount, rand_percentage)
+
+    async def check_in_owlto(self, key, index, total):
+        owlto = AsyncOwlto(key, f"[{index}/{total}]")
+
+        return await owlto.check_in()
+
+    async def deposit_to_avalon(self, key, index, total):
+        avalon = AsyncAvalon(key, f"[{index}/{total}]")
+        amount = get_rand_amount(*settings.DEPOSIT_VALUE)
+
+        return await avalon.deposit_native_token(amount)
+
+    async def deposit_to_layerbank(self, key, index, total):
+        layerbank = AsyncLayerBank(key, f"[{index}/{total}]")
+        amount = get_rand_amount(*settings.DEPOSIT_VALUE)
+
+        return await layerbank.supply(amount)
+
+    async def gaszip(self, key, index, total):
+        gaszip_helper = AsyncGasZipHelper(key, f"[{index}/{total}]")
+        bridging_data = await gaszip_helper.get_bridging_data()
+
+        if not bridging_data:
+            return False
+
+        chain, transfer_value = bridging_data
+
+        gaszip = AsyncGasZip(key, f"[{index}/{total}]", chain=chain)
+        return await gaszip.transfer(transfer_value)
+
+    async def minibridge(self, key, index, total):
+        minibridge_helper = AsyncMiniBridgeHelper(key, f"[{index}/{total}]")
+        bridging_data = await minibridge_helper.get_bridging_data()
+
+        if not bridging_data:
+            return False
+
+        chain, transfer_value = bridging_data
+
+        proxy = self.get_proxy(index)
+        async with AsyncMiniBridge(key, f"[{index}/{total}]", chain=chain, proxy=proxy) as minibridge:
+            return await minibridge.transfer(transfer_value)
+
+    async def open_treasure_box(self, key, index, total):
+        proxy = self.get_proxy(index)
+        async with AsyncBitlayer(key, f"[{index}/{total}]", proxy) as bitlayer:
+            return await bitlayer.batch_open_free_boxes()
+
+    async def get_awards(self, key, index, total):
+        proxy = self.get_proxy(index)
+        async with AsyncBitlayer(key, f"[{index}/{total}]", proxy) as bitlayer:
+            return await bitlayer.get_awards()
+
+    async def claim_airdrop(self, key, index, total, recipient):
+        proxy = self.get_proxy(index)
+        async with AsyncBitlayer(key, f"[{index}/{total}]", proxy) as bitlayer:
+            if await bitlayer.get_balance() / 10**18 <= 0.00000223 and await self.gaszip(key, index, total):
+
+                async def check():
+                    return True if await bitlayer.get_balance() / 10**18 > 0.00000223 else None
+
+                # The claim estimates its gas, so the bridged BTC has to be there first
+                await async_poll(check, timeout=300, label=f"{bitlayer.label} GasZip deposit")
+
+            await bitlayer.claim_airdrop()
+            bitlayer.cooldown.defer(10, 15)
+
+            if settings.SEND_TO_EXCHANGE:
+                await bitlayer.send_btr_to_exchange(recipient)
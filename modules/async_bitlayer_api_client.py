@@ -0,0 +1,376 @@
+import time
+from email.utils import parsedate_to_datetime
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from yarl import URL
+
+import settings
+from models.async_browser import AsyncBrowser
+from models.cooldown import Cooldown
+from models.identity import get_identity
+from models.metrics import observe_api_request
+from models.response_cache import ResponseCache
+from models.session_store import get_session_store
+from modules.config import BITLAYER_API, logger
+from modules.polling import async_poll
+
+
+class AsyncBitlayerApiClient:
+    """Awaitable twin of `BitlayerApiClient` built on aiohttp"""
+
+    def __init__(self, label, private_key, address, proxy=None):
+        self.label = label
+        self.private_key = private_key
+        self.address = address
+        self.browser = AsyncBrowser(label, proxy)
+        self.session = self.browser.session
+        self.base_url = BITLAYER_API
+        self.session_store = get_session_store()
+        self.authenticated = self.restore_session()
+        self.response_cache = ResponseCache(address)
+        self.cooldown = Cooldown()
+
+    async def close(self):
+        await self.browser.close()
+
+    # Sign a message with the private key
+    def sign_message(self, message):
+        """Sign a message with the private key."""
+        message_encoded = encode_defunct(text=message)
+        signed_message = Account.sign_message(message_encoded, private_key=get_identity(self.private_key).key)
+        return signed_message.signature.hex()
+
+    # Authenticate with BitLayer.org
+    async def login(self):
+        """Authenticate with BitLayer.org using the signed message and save the session to disk."""
+        await self.browser.check_ip()
+
+        signature = self.sign_message("BITLAYER")
+        response = await self._send("POST", "/me/login", json={"address": self.address, "signature": signature})
+        async with response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+
+        if not data or data.get("message") != "ok":
+            raise Exception(f"Authorization failed: {data}")
+
+        self.save_session()
+        self.authenticated = True
+
+    def restore_session(self):
+        """Load a saved, unexpired session of this address. Returns False when there is none."""
+        saved = self.session_store.get(self.address)
+        if not saved:
+            return False
+
+        self.session.cookie_jar.update_cookies(saved["cookies"], URL(self.base_url))
+        self.session.headers["User-Agent"] = saved["user_agent"]
+        return True
+
+    def save_session(self):
+        cookies, expires = {}, []
+        for morsel in self.session.cookie_jar:
+            cookies[morsel.key] = morsel.value
+            if morsel["max-age"]:
+                expires.append(time.time() + int(morsel["max-age"]))
+            elif morsel["expires"]:
+                expires.append(parsedate_to_datetime(morsel["expires"]).timestamp())
+
+        self.session_store.set(self.address, cookies, self.session.headers["User-Agent"], expires)
+
+    # Helper methods for GET and POST requests
+    async def _send(self, method, endpoint, **kwargs):
+        url = f"{self.base_url}{endpoint}"
+        started_at = time.perf_counter()
+
+        try:
+            response = await self.browser.request(method, url, **kwargs)
+        except Exception as error:
+            observe_api_request(endpoint, self.browser.proxy, type(error).__name__, time.perf_counter() - started_at)
+            raise
+
+        observe_api_request(endpoint, self.browser.proxy, response.status, time.perf_counter() - started_at)
+        return response
+
+    async def _make_request(self, method, endpoint, **kwargs):
+        """Wrapper function for making requests, logs in first when there is no saved session."""
+        await self.cooldown.async_wait()  # Pause left over from the previous action
+
+        if not self.authenticated:
+            await self.login()
+
+        response = await self._send(method, endpoint, **kwargs)
+
+        # The session expired or was revoked, log in again and repeat the request once
+        if response.status in (401, 403):
+            response.release()
+            logger.debug(f"{self.label} Session rejected ({response.status}), logging in again")
+            self.session_store.delete(self.address)
+            self.session.cookie_jar.clear()
+            await self.login()
+            response = await self._send(method, endpoint, **kwargs)
+
+        async with response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def get(self, endpoint, fresh=False, persist=False, **kwargs):
+        """
+        Make a GET request to the specified endpoint, answered from the response cache while it is valid.
+        `fresh=True` always asks the server (polling), `persist=True` also keeps the response on disk.
+        """
+        key = self.response_cache.get_key(endpoint, kwargs.get("params"))
+
+        if not fresh:
+            data = self.response_cache.get(key, persist)
+            if data is not None:
+                return data
+
+        data = await self._make_request("GET", endpoint, **kwargs)
+        self.response_cache.set(key, data, persist)
+        return data
+
+    async def post(self, endpoint, **kwargs):
+        """Make a POST request to the specified endpoint."""
+        return await self.mutate("POST", endpoint, **kwargs)
+
+    async def mutate(self, method, endpoint, **kwargs):
+        """Make a request that changes state on the server, cached responses are dropped."""
+        try:
+            return await self._make_request(method, endpoint, **kwargs)
+        finally:
+            self.response_cache.clear()
+
+    # API requests
+    async def get_user_data(self, silent=False, end="", fresh=False):
+        params = {"_data": "routes/($lang)._app+/me+/_index+/_layout"}
+        data = await self.get("/me/tasks", params=params, fresh=fresh)
+
+        if not data:
+            raise Exception(f"{self.label} Failed to get user data")
+
+        points = data["profile"]["totalPoints"]
+        btr = data["profile"]["btr"]
+        level = data["profile"]["level"]
+        days = data["profile"]["daysOnBitlayer"]
+        rank = data["meInfo"]["rank"]
+        txn = data["profile"]["txn"]
+
+        if not silent:
+            logger.debug(
+                f"{self.label} BTR: {btr}, Pts: {points}, LVL: {level}, Rank: {rank}, Days on Bitlayer: {days}, Txn: {txn} {end}"
+            )
+        return data
+
+    async def start(self, task):
+        id, title, main_title = (
+            task["taskId"],
+            task.get("title", "Racer Center rewards"),
+            task.get("mainTitle", None),
+        )
+
+        if main_title:
+            title = main_title
+
+        data = await self.post("/me/task/start", json={"taskId": id})
+
+        if not data or data.get("message") != "ok":
+            raise Exception(f"Failed to start {title}: {data}")
+
+        logger.info(f"{self.label} Started {title.strip()}")
+        self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
+
+    async def verify(self, task):
+        id, title, main_title, pts = (
+            task["taskId"],
+            task.get("title", "Racer Center rewards"),
+            task.get("mainTitle", None),
+            task["rewardPoints"],
+        )
+
+        if main_title:
+            title = main_title
+
+        data = await self.post("/me/task/verify", json={"taskId": id})
+
+        if not data or data.get("message") != "ok":
+            raise Exception(f"Failed to verify task {id}: {data}")
+
+        if title == "Racer Center rewards":
+            logger.success(f"{self.label} Claimed {pts} points for {title}")
+        self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
+
+    async def wait_for_daily_browse_status(self):
+        async def check():
+            data = await self.post("/me/task/report", json={"taskId": 1, "pageName": "dapp_center"})
+
+            if not data:
+                raise Exception(f"Failed to report daily browse status: {data}")
+
+            checked = data.get("checked", False)
+
+            if not checked:
+                logger.info(f"{self.label} Claimable: {checked}")
+                return None
+            return checked
+
+        return await async_poll(check, interval=5, timeout=300)
+
+    def get_value_for_progress(self, task: dict) -> int:
+        cur_progress = task["extraData"]["cur_done_progress"]
+        progress_cfg = task["action"]["payload"]["progress_cfg"]
+
+        pts = 0
+
+        for item in progress_cfg:
+            if int(cur_progress) >= item["key"]:
+                pts = item["value"]
+            else:
+                return pts
+
+    async def claim(self, task, silent=False) -> bool:
+        id, type, title, main_title, pts = (
+            task["taskId"],
+            task["taskType"],
+            task["title"],
+            task.get("mainTitle", None),
+            task.get("rewardPoints", 0),
+        )
+
+        if main_title:
+            title = main_title
+
+        data = await self.post("/me/task/claim", json={"taskId": id, "taskType": type})
+
+        if task["taskId"] == 34:
+            pts = self.get_value_for_progress(task)
+
+        if not data or data.get("message") != "ok":
+            raise Exception(f"Failed to claim task {id}: {data}")
+
+        if not silent:
+            logger.success(f"{self.label} Claimed {pts} points for {title.strip()}")
+        self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
+        return True
+
+    async def get_draw_id(self):
+        data = await self.mutate("GET", "/api/draw/car?drawType=2&drawTimes=1")
+
+        if not data:
+            raise Exception(f"Failed to get draw id: {data}")
+
+        return data["drawId"]
+
+    async def get_draw_result(self, draw_id):
+        data = await self.get(f"/api/draw/result/{draw_id}", fresh=True)
+
+        if not data:
+            raise Exception(f"Failed to fetch draw result: {data}")
+
+        return data
+
+    async def start_daily_check(self) -> bool:
+        data = await self.mutate("GET", "/api/btcfi/daily-check")
+
+        if not data or data.get("success") != True:
+            raise Exception(f"Failed to start daily check: {data}")
+
+        return True
+
+    async def claim_daily_check(self) -> int:
+        data = await self.mutate("GET", "/api/btcfi/claim-order?from_page=")
+
+        if not data or data.get("success") != True:
+            raise Exception(f"Failed to claim daily check: {data}")
+
+        return int(data["data"]["orderId"])
+
+    async def get_minging_gala_info(self) -> dict:
+        params = {"_data": "routes/($lang)._app+/mining-gala+/_index/index"}
+        data = await self.get("/mining-gala", params=params)
+
+        if not data:
+            raise Exception(f"Failed to get mining gala info: {data}")
+
+        return data
+
+    async def get_box_info(self) -> dict:
+        """
+        Retrieves box information, including ID, expiration timestamp and unboxed item count.
+
+        Returns:
+            dict: Example:
+            {
+                "box_id": "b2ef1a30-ccc0-419d-90da-0e0480c550bc",
+                "expire_at": 1732095067,
+                "count": 10
+            }
+        """
+        params = {"type": "project", "count": "-1"}
+        data = await self.mutate("GET", "/api/mining-gala/box", params=params)
+
+        if not data:
+            raise Exception(f"Failed to get box info: {data}")
+
+        return data
+
+    async def get_unboxing_status(self, box_id: str) -> dict:
+        """
+        Polls the unboxing status of a box until the status equals 3, giving up after about a minute.
+
+        Returns:
+            dict: Example:
+            {
+                "btr": 20.2,
+                "status": 3,
+                "count": 10
+            }
+        """
+
+        async def check():
+            data = await self.get(f"/api/mining-gala/result/{box_id}", fresh=True)
+
+            if not data:
+                raise Exception(f"Failed to get unboxing status for box_id {box_id}")
+
+            # 3 is the magic number!
+            return data if data.get("status") == 3 else None
+
+        return await async_poll(check, interval=5, timeout=60, label=f"{self.label} Box {box_id}")
+
+    async def get_car_info(self):
+        params = {"_data": "routes/($lang)._app+/assemble-cars/_index"}
+        data = (await self.get(f"/assemble-cars", params=params))["userInfo"]
+
+        if not data:
+            raise Exception(f"Failed to get car info")
+
+        logger.debug(
+            f"{self.label} Normal cars: {data['normalCarAmount']}, Premium cars: {data['premiumCarAmount']}, Top cars: {data['topCarAmount']}"
+        )
+        return data
+
+    async def assemble_car(self, star_rating: int) -> bool:
+        payload = {"starRating": star_rating}
+        data = await self.post("/api/raffle/assemble", json=payload)
+
+        if not data or data.get("message") != "ok":
+            raise Exception(f"Failed to assemble {star_rating}-star car: {data}")
+
+        logger.success(f"{self.label} {data['message']}")
+        return True
+
+    async def get_awards(self) -> dict:
+        data = await self.get("/airdrop/btr/awards", persist=True)
+
+        if not data:
+            raise Exception(f"Failed to fetch awards")
+
+        logger.debug(f"{self.label} Eligible: {data['eligible']}")
+        logger.debug(f"{self.label} Bronze: {int(data['bronze']['amount']) / 10 ** 18} BTR")
+        logger.debug(f"{self.label} Silver: {int(data['silver']['amount']) / 10 ** 18} BTR")
+        logger.debug(f"{self.label} Gold: {int(data['gold']['amount']) / 10 ** 18} BTR")
+        logger.debug(f"{self.label} Total: {int(data['amount']) / 10 ** 18} BTR")
+
+        return data
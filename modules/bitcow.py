@@ -1,7 +1,8 @@
 import settings
+from models.async_wallet import AsyncWallet
 from models.wallet import Wallet
 from modules.config import BITCOW, BITCOW_ABI, BITUSD, INFINITE_AMOUNT, WBTC, logger
-from modules.utils import check_min_balance, sleep
+from modules.utils import async_check_min_balance, check_min_balance
 
 
 class BitCow(Wallet):
@@ -15,7 +16,7 @@ class BitCow(Wallet):
         if to_token == "BITUSD":
             tx_status = self.swap_btc_to_bitusd(amount)
             if tx_status:
-                sleep(*settings.SLEEP_BETWEEN_ACTIONS)
+                self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
 
             # Perform reverse swap
             return self.swap_bitusd_to_btc(percentage)
@@ -23,7 +24,7 @@ class BitCow(Wallet):
         elif to_token == "WBTC":
             tx_status = self.swap_btc_to_wbtc(amount)
             if tx_status:
-                sleep(*settings.SLEEP_BETWEEN_ACTIONS)
+                self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
 
             # Perform reverse swap
             return self.swap_wbtc_to_btc(percentage)
@@ -31,13 +32,14 @@ class BitCow(Wallet):
     def swap_btc_to_bitusd(self, amount):
         """Function: swapBTCtoERC20 (address[] pools, bool[] isXtoYs, uint256 minOutputAmount)"""
 
-        contract_tx = self.contract.functions.swapBTCtoERC20(
+        function = self.contract.functions.swapBTCtoERC20(
             ["0xDFA33A77ce4420bf4cA7bFa9c1a57A40307a092e"], [True], 0
-        ).build_transaction(self.get_tx_data(value=amount))
+        )
+        contract_tx = self.build_tx(function, value=amount)
 
         return self.send_tx(
             contract_tx,
-            tx_label=f"{self.label} swap {amount / 10**18:.8f} BTC > BITUSD [{self.tx_count}]",
+            tx_label=f"{self.label} swap {amount / 10**18:.8f} BTC > BITUSD [{contract_tx['nonce']}]",
         )
 
     def swap_bitusd_to_btc(self, percentage):
@@ -55,30 +57,29 @@ class BitCow(Wallet):
             BITUSD,
             self.contract.address,
             INFINITE_AMOUNT,
-            tx_label=f"{self.label} {tx_label} [{self.tx_count}]",
+            tx_label=f"{self.label} {tx_label} [{self.nonce_manager.peek()}]",
         )
 
-        contract_tx = self.contract.functions.swap(
+        function = self.contract.functions.swap(
             amount,
             ["0xDFA33A77ce4420bf4cA7bFa9c1a57A40307a092e"],
             [False],
             0,
-        ).build_transaction(self.get_tx_data())
+        )
+        contract_tx = self.build_tx(function)
 
         return self.send_tx(
             contract_tx,
-            tx_label=f"{self.label} swap {amount / 10**decimals:.8f} BTIUSD > WBTC [{self.tx_count}]",
+            tx_label=f"{self.label} swap {amount / 10**decimals:.8f} BTIUSD > WBTC [{contract_tx['nonce']}]",
         )
 
     def swap_btc_to_wbtc(self, amount):
         """Function: swapBTCtoWBTC (address wbtc)"""
-        contract_tx = self.contract.functions.swapBTCtoWBTC(WBTC).build_transaction(
-            self.get_tx_data(value=amount)
-        )
+        contract_tx = self.build_tx(self.contract.functions.swapBTCtoWBTC(WBTC), value=amount)
 
         return self.send_tx(
             contract_tx,
-            tx_label=f"{self.label} swap {amount / 10**18:.8f} BTC > WBTC [{self.tx_count}]",
+            tx_label=f"{self.label} swap {amount / 10**18:.8f} BTC > WBTC [{contract_tx['nonce']}]",
         )
 
     def swap_wbtc_to_btc(self, percentage):
@@ -96,14 +97,115 @@ class BitCow(Wallet):
             WBTC,
             self.contract.address,
             INFINITE_AMOUNT,
-            tx_label=f"{self.label} {tx_label} [{self.tx_count}]",
+            tx_label=f"{self.label} {tx_label} [{self.nonce_manager.peek()}]",
         )
 
-        contract_tx = self.contract.functions.swapWBTCtoBTC(
-            WBTC, amount
-        ).build_transaction(self.get_tx_data())
+        contract_tx = self.build_tx(self.contract.functions.swapWBTCtoBTC(WBTC, amount))
 
         return self.send_tx(
             contract_tx,
-            tx_label=f"{self.label} swap {amount / 10**decimals:.8f} {symbol} > BTC [{self.tx_count}]",
+            tx_label=f"{self.label} swap {amount / 10**decimals:.8f} {symbol} > BTC [{contract_tx['nonce']}]",
+        )
+
+
+class AsyncBitCow(AsyncWallet):
+    def __init__(self, private_key, counter):
+        super().__init__(private_key, counter)
+        self.label += "BitCow |"
+        self.contract = self.get_contract(BITCOW, abi=BITCOW_ABI)
+
+    @async_check_min_balance
+    async def swap(self, to_token, amount, percentage):
+        if to_token == "BITUSD":
+            tx_status = await self.swap_btc_to_bitusd(amount)
+            if tx_status:
+                self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
+
+            # Perform reverse swap
+            return await self.swap_bitusd_to_btc(percentage)
+
+        elif to_token == "WBTC":
+            tx_status = await self.swap_btc_to_wbtc(amount)
+            if tx_status:
+                self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
+
+            # Perform reverse swap
+            return await self.swap_wbtc_to_btc(percentage)
+
+    async def swap_btc_to_bitusd(self, amount):
+        """Function: swapBTCtoERC20 (address[] pools, bool[] isXtoYs, uint256 minOutputAmount)"""
+
+        function = self.contract.functions.swapBTCtoERC20(
+            ["0xDFA33A77ce4420bf4cA7bFa9c1a57A40307a092e"], [True], 0
+        )
+        contract_tx = await self.build_tx(function, value=amount)
+
+        return await self.send_tx(
+            contract_tx,
+            tx_label=f"{self.label} swap {amount / 10**18:.8f} BTC > BITUSD [{contract_tx['nonce']}]",
+        )
+
+    async def swap_bitusd_to_btc(self, percentage):
+        """Function: swap (uint256 inputAmount, address[] pools, bool[] isXtoYs, uint256 minOutputAmount)"""
+        balance, decimals, symbol = await self.get_token(BITUSD)
+
+        if balance == 0:
+            logger.warning(f"{self.label} No {symbol} tokens to swap \n")
+            return
+
+        amount = int((percentage / 100) * balance)
+
+        tx_label = f"approve {amount / 10 ** decimals:.8f} {symbol}"
+        await self.approve(
+            BITUSD,
+            self.contract.address,
+            INFINITE_AMOUNT,
+            tx_label=f"{self.label} {tx_label} [{await self.nonce_manager.peek()}]",
+        )
+
+        function = self.contract.functions.swap(
+            amount,
+            ["0xDFA33A77ce4420bf4cA7bFa9c1a57A40307a092e"],
+            [False],
+            0,
+        )
+        contract_tx = await self.build_tx(function)
+
+        return await self.send_tx(
+            contract_tx,
+            tx_label=f"{self.label} swap {amount / 10**decimals:.8f} BTIUSD > WBTC [{contract_tx['nonce']}]",
+        )
+
+    async def swap_btc_to_wbtc(self, amount):
+        """Function: swapBTCtoWBTC (address wbtc)"""
+        contract_tx = await self.build_tx(self.contract.functions.swapBTCtoWBTC(WBTC), value=amount)
+
+        return await self.send_tx(
+            contract_tx,
+            tx_label=f"{self.label} swap {amount / 10**18:.8f} BTC > WBTC [{contract_tx['nonce']}]",
+        )
+
+    async def swap_wbtc_to_btc(self, percentage):
+        """Function: swapWBTCtoBTC (address wbtc, uint256 amount)"""
+        balance, decimals, symbol = await self.get_token(WBTC)
+
+        if balance == 0:
+            logger.warning(f"{self.label} No {symbol} tokens to swap \n")
+            return
+
+        amount = int((percentage / 100) * balance)
+
+        tx_label = f"approve {amount / 10 ** decimals:.8f} {symbol}"
+        await self.approve(
+            WBTC,
+            self.contract.address,
+            INFINITE_AMOUNT,
+            tx_label=f"{self.label} {tx_label} [{await self.nonce_manager.peek()}]",
+        )
+
+        contract_tx = await self.build_tx(self.contract.functions.swapWBTCtoBTC(WBTC, amount))
+
+        return await self.send_tx(
+            contract_tx,
+            tx_label=f"{self.label} swap {amount / 10**decimals:.8f} {symbol} > BTC [{contract_tx['nonce']}]",
         )
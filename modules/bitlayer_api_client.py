@@ -5,8 +5,13 @@ from eth_account.messages import encode_defunct
 
 import settings
 from models.browser import Browser
-from modules.config import logger
-from modules.utils import random_sleep
+from models.cooldown import Cooldown
+from models.identity import get_identity
+from models.metrics import observe_api_request
+from models.response_cache import ResponseCache
+from models.session_store import get_session_store
+from modules.config import BITLAYER_API, logger
+from modules.polling import poll
 
 
 class BitlayerApiClient:
@@ -16,23 +21,28 @@ class BitlayerApiClient:
         self.address = address
         self.browser = Browser(label, proxy)
         self.session = self.browser.session
-        self.base_url = "https://www.bitlayer.org"
-        self.login()
+        self.base_url = BITLAYER_API
+        self.session_store = get_session_store()
+        self.authenticated = self.restore_session()
+        self.response_cache = ResponseCache(address)
+        self.cooldown = Cooldown()
 
     # Sign a message with the private key
     def sign_message(self, message):
         """Sign a message with the private key."""
         message_encoded = encode_defunct(text=message)
-        signed_message = Account.sign_message(message_encoded, private_key=self.private_key)
+        signed_message = Account.sign_message(message_encoded, private_key=get_identity(self.private_key).key)
         return signed_message.signature.hex()
 
     # Authenticate with BitLayer.org
     def login(self):
-        """Authenticate with BitLayer.org using the signed message."""
+        """Authenticate with BitLayer.org using the signed message and save the session to disk."""
         self.browser.check_ip()
 
         signature = self.sign_message("BITLAYER")
-        data = self.post("/me/login", json={"address": self.address, "signature": signature})
+        response = self._send("POST", "/me/login", json={"address": self.address, "signature": signature})
+        response.raise_for_status()
+        data = response.json()
 
         if not data or data.get("message") != "ok":
             raise Exception(f"Authorization failed: {data}")
@@ -41,26 +51,93 @@ class BitlayerApiClient:
         for cookie in self.session.cookies:
             self.session.cookies.set(cookie.name, cookie.value)
 
+        self.save_session()
+        self.authenticated = True
+
+    def restore_session(self):
+        """Load a saved, unexpired session of this address. Returns False when there is none."""
+        saved = self.session_store.get(self.address)
+        if not saved:
+            return False
+
+        for name, value in saved["cookies"].items():
+            self.session.cookies.set(name, value)
+        self.session.headers["User-Agent"] = saved["user_agent"]
+        return True
+
+    def save_session(self):
+        self.session_store.set(
+            self.address,
+            {cookie.name: cookie.value for cookie in self.session.cookies},
+            self.session.headers["User-Agent"],
+            [cookie.expires for cookie in self.session.cookies],
+        )
+
     # Helper methods for GET and POST requests
-    def _make_request(self, method, endpoint, **kwargs):
-        """Wrapper function for making requests."""
+    def _send(self, method, endpoint, **kwargs):
         url = f"{self.base_url}{endpoint}"
-        response = self.session.request(method, url, **kwargs)
+        started_at = time.perf_counter()
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception as error:
+            observe_api_request(endpoint, self.browser.proxy, type(error).__name__, time.perf_counter() - started_at)
+            raise
+
+        observe_api_request(endpoint, self.browser.proxy, response.status_code, time.perf_counter() - started_at)
+        return response
+
+    def _make_request(self, method, endpoint, **kwargs):
+        """Wrapper function for making requests, logs in first when there is no saved session."""
+        self.cooldown.wait()  # Pause left over from the previous action
+
+        if not self.authenticated:
+            self.login()
+
+        response = self._send(method, endpoint, **kwargs)
+
+        # The session expired or was revoked, log in again and repeat the request once
+        if response.status_code in (401, 403):
+            logger.debug(f"{self.label} Session rejected ({response.status_code}), logging in again")
+            self.session_store.delete(self.address)
+            self.session.cookies.clear()
+            self.login()
+            response = self._send(method, endpoint, **kwargs)
+
         response.raise_for_status()
         return response.json()
 
-    def get(self, endpoint, **kwargs):
-        """Make a GET request to the specified endpoint."""
-        return self._make_request("GET", endpoint, **kwargs)
+    def get(self, endpoint, fresh=False, persist=False, **kwargs):
+        """
+        Make a GET request to the specified endpoint, answered from the response cache while it is valid.
+        `fresh=True` always asks the server (polling), `persist=True` also keeps the response on disk.
+        """
+        key = self.response_cache.get_key(endpoint, kwargs.get("params"))
+
+        if not fresh:
+            data = self.response_cache.get(key, persist)
+            if data is not None:
+                return data
+
+        data = self._make_request("GET", endpoint, **kwargs)
+        self.response_cache.set(key, data, persist)
+        return data
 
     def post(self, endpoint, **kwargs):
         """Make a POST request to the specified endpoint."""
-        return self._make_request("POST", endpoint, **kwargs)
+        return self.mutate("POST", endpoint, **kwargs)
+
+    def mutate(self, method, endpoint, **kwargs):
+        """Make a request that changes state on the server, cached responses are dropped."""
+        try:
+            return self._make_request(method, endpoint, **kwargs)
+        finally:
+            self.response_cache.clear()
 
     # API requests
-    def get_user_data(self, silent=False, end=""):
+    def get_user_data(self, silent=False, end="", fresh=False):
         params = {"_data": "routes/($lang)._app+/me+/_index+/_layout"}
-        data = self.get("/me/tasks", params=params)
+        data = self.get("/me/tasks", params=params, fresh=fresh)
 
         if not data:
             raise Exception(f"{self.label} Failed to get user data")
@@ -94,7 +171,7 @@ class BitlayerApiClient:
             raise Exception(f"Failed to start {title}: {data}")
 
         logger.info(f"{self.label} Started {title.strip()}")
-        random_sleep(*settings.SLEEP_BETWEEN_ACTIONS)
+        self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
 
     def verify(self, task):
         id, title, main_title, pts = (
@@ -114,21 +191,23 @@ class BitlayerApiClient:
 
         if title == "Racer Center rewards":
             logger.success(f"{self.label} Claimed {pts} points for {title}")
-        random_sleep(*settings.SLEEP_BETWEEN_ACTIONS)
+        self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
 
     def wait_for_daily_browse_status(self):
-        data = self.post("/me/task/report", json={"taskId": 1, "pageName": "dapp_center"})
+        def check():
+            data = self.post("/me/task/report", json={"taskId": 1, "pageName": "dapp_center"})
 
-        if not data:
-            raise Exception(f"Failed to report daily browse status: {data}")
+            if not data:
+                raise Exception(f"Failed to report daily browse status: {data}")
+
+            checked = data.get("checked", False)
 
-        checked = data.get("checked", False)
+            if not checked:
+                logger.info(f"{self.label} Claimable: {checked}")
+                return None
+            return checked
 
-        if not checked:
-            time.sleep(5)
-            logger.info(f"{self.label} Claimable: {checked}")
-            return self.wait_for_daily_browse_status()  # Recursive call
-        return checked
+        return poll(check, interval=5, timeout=300)
 
     def get_value_for_progress(self, task: dict) -> int:
         cur_progress = task["extraData"]["cur_done_progress"]
@@ -164,11 +243,11 @@ class BitlayerApiClient:
 
         if not silent:
             logger.success(f"{self.label} Claimed {pts} points for {title.strip()}")
-        random_sleep(*settings.SLEEP_BETWEEN_ACTIONS)
+        self.cooldown.defer(*settings.SLEEP_BETWEEN_ACTIONS)
         return True
 
     def get_draw_id(self):
-        data = self.get("/api/draw/car?drawType=2&drawTimes=1")
+        data = self.mutate("GET", "/api/draw/car?drawType=2&drawTimes=1")
 
         if not data:
             raise Exception(f"Failed to get draw id: {data}")
@@ -176,7 +255,7 @@ class BitlayerApiClient:
         return data["drawId"]
 
     def get_draw_result(self, draw_id):
-        data = self.get(f"/api/draw/result/{draw_id}")
+        data = self.get(f"/api/draw/result/{draw_id}", fresh=True)
 
         if not data:
             raise Exception(f"Failed to fetch draw result: {data}")
@@ -184,7 +263,7 @@ class BitlayerApiClient:
         return data
 
     def start_daily_check(self) -> bool:
-        data = self.get("/api/btcfi/daily-check")
+        data = self.mutate("GET", "/api/btcfi/daily-check")
 
         if not data or data.get("success") != True:
             raise Exception(f"Failed to start daily check: {data}")
@@ -192,7 +271,7 @@ class BitlayerApiClient:
         return True
 
     def claim_daily_check(self) -> int:
-        data = self.get("/api/btcfi/claim-order?from_page=")
+        data = self.mutate("GET", "/api/btcfi/claim-order?from_page=")
 
         if not data or data.get("success") != True:
             raise Exception(f"Failed to claim daily check: {data}")
@@ -221,17 +300,16 @@ class BitlayerApiClient:
             }
         """
         params = {"type": "project", "count": "-1"}
-        data = self.get("/api/mining-gala/box", params=params)
+        data = self.mutate("GET", "/api/mining-gala/box", params=params)
 
         if not data:
             raise Exception(f"Failed to get box info: {data}")
 
         return data
 
-    def get_unboxing_status(self, box_id: str, attempts: int = 0) -> dict:
+    def get_unboxing_status(self, box_id: str) -> dict:
         """
-        Recursively retrieves the unboxing status of a box until the status equals 3
-        or the maximum number of attempts (10) is reached.
+        Polls the unboxing status of a box until the status equals 3, giving up after about a minute.
 
         Returns:
             dict: Example:
@@ -241,20 +319,17 @@ class BitlayerApiClient:
                 "count": 10
             }
         """
-        if attempts >= 10:
-            raise Exception(f"Max attempts reached for box_id {box_id}")
 
-        data = self.get(f"/api/mining-gala/result/{box_id}")
+        def check():
+            data = self.get(f"/api/mining-gala/result/{box_id}", fresh=True)
 
-        if not data:
-            raise Exception(f"Failed to get unboxing status for box_id {box_id}")
+            if not data:
+                raise Exception(f"Failed to get unboxing status for box_id {box_id}")
 
-        # 3 is the magic number!
-        if data.get("status") == 3:
-            return data
+            # 3 is the magic number!
+            return data if data.get("status") == 3 else None
 
-        random_sleep(5, 5)
-        return self.get_unboxing_status(box_id, attempts + 1)
+        return poll(check, interval=5, timeout=60, label=f"{self.label} Box {box_id}")
 
     def get_car_info(self):
         params = {"_data": "routes/($lang)._app+/assemble-cars/_index"}
@@ -279,7 +354,7 @@ class BitlayerApiClient:
         return True
 
     def get_awards(self) -> dict:
-        data = self.get("/airdrop/btr/awards")
+        data = self.get("/airdrop/btr/awards", persist=True)
 
         if not data:
             raise Exception(f"Failed to fetch awards")
@@ -11,6 +11,9 @@ logger.add(
     format="<white>{time:HH:mm:ss}</white> | <level>{message}</level>",
 )
 
+# On-disk cache for immutable chain data
+CACHE_DIR = "cache"
+
 # Network data
 CHAIN_DATA = {
     "ethereum": {
@@ -52,6 +55,9 @@ CHAIN_DATA = {
     },
 }
 
+# Bitlayer app API, the endpoints of BitlayerApiClient are relative to it
+BITLAYER_API = "https://www.bitlayer.org"
+
 # Bitlayer app contracts
 BITLAYER_LOTTERY = "0x1fdaca95c6ba567044ea4f4c977897bebfa16b41"
 BITLAYER_CHECK_IN = "0x5e63fc3ea7482b77c9750a2e9c649aa93eaf2883"
@@ -79,6 +85,9 @@ GASZIP_DIRECT_DEPOSIT_ADDRESS = "0x391E7C679d29bD940d63be94AD22A25d25b5A604"
 GASZIP_DATA = "0x010093"
 
 
+# Canonical Multicall3 deployment, override per chain with a "multicall" key in CHAIN_DATA
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
 # Infinite amount for max approve
 INFINITE_AMOUNT = 115792089237316195423570985008687907853269984665640564039457584007913129639935
 
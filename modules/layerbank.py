@@ -1,34 +1,51 @@
+from models.async_wallet import AsyncWallet
 from models.wallet import Wallet
 from modules.config import LAYERBANK
-from modules.utils import check_min_balance
+from modules.utils import async_check_min_balance, check_min_balance
 
 
 class LayerBank(Wallet):
+    CONTRACT_ABI = [
+        {
+            "type": "function",
+            "name": "supply",
+            "inputs": [
+                {"name": "lToken", "type": "address"},
+                {"name": "uAmount", "type": "uint256"},
+            ],
+        },
+    ]
+
     def __init__(self, private_key, counter):
         super().__init__(private_key, counter)
         self.label += "LayerBank |"
-        contract_abi = [
-            {
-                "type": "function",
-                "name": "supply",
-                "inputs": [
-                    {"name": "lToken", "type": "address"},
-                    {"name": "uAmount", "type": "uint256"},
-                ],
-            },
-        ]
-
-        self.contract = self.get_contract(LAYERBANK, abi=contract_abi)
+        self.contract = self.get_contract(LAYERBANK, abi=self.CONTRACT_ABI)
 
     @check_min_balance
     def supply(self, amount):
         lToken = self.to_checksum("0x1471b4FAc13d42F3447fBA145bdfE95C6e7e7540")
 
-        contract_tx = self.contract.functions.supply(lToken, amount).build_transaction(
-            self.get_tx_data(value=amount)
-        )
+        contract_tx = self.build_tx(self.contract.functions.supply(lToken, amount), value=amount)
 
         return self.send_tx(
             contract_tx,
-            tx_label=f"{self.label} deposit {amount / 10**18:.8f} BTC [{self.tx_count}]",
+            tx_label=f"{self.label} deposit {amount / 10**18:.8f} BTC [{contract_tx['nonce']}]",
+        )
+
+
+class AsyncLayerBank(AsyncWallet):
+    def __init__(self, private_key, counter):
+        super().__init__(private_key, counter)
+        self.label += "LayerBank |"
+        self.contract = self.get_contract(LAYERBANK, abi=LayerBank.CONTRACT_ABI)
+
+    @async_check_min_balance
+    async def supply(self, amount):
+        lToken = self.to_checksum("0x1471b4FAc13d42F3447fBA145bdfE95C6e7e7540")
+
+        contract_tx = await self.build_tx(self.contract.functions.supply(lToken, amount), value=amount)
+
+        return await self.send_tx(
+            contract_tx,
+            tx_label=f"{self.label} deposit {amount / 10**18:.8f} BTC [{contract_tx['nonce']}]",
         )
@@ -1,31 +1,50 @@
 from datetime import datetime
 
+from models.async_wallet import AsyncWallet
 from models.wallet import Wallet
 from modules.config import OWLTO
-from modules.utils import check_min_balance
+from modules.utils import async_check_min_balance, check_min_balance
 
 
 class Owlto(Wallet):
+    CONTRACT_ABI = [
+        {
+            "type": "function",
+            "name": "checkIn",
+            "inputs": [{"name": "date", "type": "uint256"}],
+        }
+    ]
+
     def __init__(self, private_key, counter):
         super().__init__(private_key, counter)
         self.label += "Owlto |"
-        contract_abi = [
-            {
-                "type": "function",
-                "name": "checkIn",
-                "inputs": [{"name": "date", "type": "uint256"}],
-            }
-        ]
-        self.contract = self.get_contract(OWLTO, abi=contract_abi)
+        self.contract = self.get_contract(OWLTO, abi=self.CONTRACT_ABI)
 
     @check_min_balance
     def check_in(self):
         date = int(datetime.now().strftime("%Y%m%d"))
 
-        tx_data = self.get_tx_data()
-        contract_tx = self.contract.functions.checkIn(date).build_transaction(tx_data)
+        contract_tx = self.build_tx(self.contract.functions.checkIn(date))
 
         return self.send_tx(
             contract_tx,
-            tx_label=f"{self.label} check-in [{self.tx_count}]",
+            tx_label=f"{self.label} check-in [{contract_tx['nonce']}]",
+        )
+
+
+class AsyncOwlto(AsyncWallet):
+    def __init__(self, private_key, counter):
+        super().__init__(private_key, counter)
+        self.label += "Owlto |"
+        self.contract = self.get_contract(OWLTO, abi=Owlto.CONTRACT_ABI)
+
+    @async_check_min_balance
+    async def check_in(self):
+        date = int(datetime.now().strftime("%Y%m%d"))
+
+        contract_tx = await self.build_tx(self.contract.functions.checkIn(date))
+
+        return await self.send_tx(
+            contract_tx,
+            tx_label=f"{self.label} check-in [{contract_tx['nonce']}]",
         )
@@ -0,0 +1,101 @@
+import asyncio
+import random
+import time
+
+from modules.config import logger
+
+
+def get_delays(interval, backoff, max_interval, jitter):
+    """Yields the pauses between checks: exponential backoff capped at `max_interval`, +/- `jitter` share"""
+    delay = interval
+    while True:
+        yield delay * random.uniform(1 - jitter, 1 + jitter)
+        delay = min(delay * backoff, max_interval)
+
+
+def poll(
+    check, interval=5, backoff=1.5, max_interval=60, jitter=0.1, timeout=600, cancel=None, label=None, delay=0
+):
+    """
+    Calls `check()` until it returns something other than None and returns that value.
+
+    Args:
+        check: function returning None while the awaited state is not reached yet
+        timeout: seconds until TimeoutError is raised
+        cancel: optional threading.Event, polling stops and returns None once it is set
+        label: when given, every pause is logged with it
+        delay: seconds before the first check, e.g. for a state that takes a while to change at all
+    """
+    deadline = time.monotonic() + timeout
+
+    if delay:
+        if label:
+            logger.info(f"{label} checking in {delay:.0f}s")
+        if cancel:
+            cancel.wait(delay)
+        else:
+            time.sleep(delay)
+
+    for delay in get_delays(interval, backoff, max_interval, jitter):
+        if cancel and cancel.is_set():
+            return None
+
+        result = check()
+        if result is not None:
+            return result
+
+        delay = min(delay, deadline - time.monotonic())
+        if delay <= 0:
+            raise TimeoutError(f"{label or 'Polling'} timed out after {timeout}s")
+
+        if label:
+            logger.info(f"{label} checking again in {delay:.0f}s")
+
+        if cancel:
+            cancel.wait(delay)
+        else:
+            time.sleep(delay)
+
+
+async def async_poll(
+    check, interval=5, backoff=1.5, max_interval=60, jitter=0.1, timeout=600, cancel=None, label=None, delay=0
+):
+    """
+    Awaitable `poll` for a coroutine `check`. Waiting costs no thread, and cancelling the task stops it
+    like setting `cancel` (an asyncio.Event) does.
+    """
+    deadline = time.monotonic() + timeout
+
+    if delay:
+        if label:
+            logger.info(f"{label} checking in {delay:.0f}s")
+        if cancel:
+            try:
+                await asyncio.wait_for(cancel.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(delay)
+
+    for delay in get_delays(interval, backoff, max_interval, jitter):
+        if cancel and cancel.is_set():
+            return None
+
+        result = await check()
+        if result is not None:
+            return result
+
+        delay = min(delay, deadline - time.monotonic())
+        if delay <= 0:
+            raise TimeoutError(f"{label or 'Polling'} timed out after {timeout}s")
+
+        if label:
+            logger.info(f"{label} checking again in {delay:.0f}s")
+
+        if cancel:
+            try:
+                await asyncio.wait_for(cancel.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(delay)
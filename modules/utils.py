@@ -1,3 +1,4 @@
+import asyncio
 import csv
 import os
 import random
@@ -35,6 +36,21 @@ def check_min_balance(func):
     return wrapper
 
 
+def async_check_min_balance(func):
+    async def wrapper(self, *args, **kwargs):
+        balance = await self.get_balance()
+        min_balance = self.web3.to_wei(settings.MIN_BTC_BALANCE, "ether")
+
+        if balance < min_balance:
+            logger.warning(
+                f"{self.label} Current balance is under {settings.MIN_BTC_BALANCE:.8f} BTC, skipping \n"
+            )
+            return
+        return await func(self, *args, **kwargs)
+
+    return wrapper
+
+
 def create_csv(path, mode, headers, data):
     directory = os.path.dirname(path)
     dir_exists = os.path.exists(directory)
@@ -62,6 +78,11 @@ def random_sleep(min_time, max_time):
     time.sleep(duration)
 
 
+async def async_random_sleep(min_time, max_time):
+    duration = random.randint(min_time, max_time)
+    await asyncio.sleep(duration)
+
+
 def sleep(sleep_time, to_sleep=None, label="Sleep until next account", new_line=True):
     if to_sleep is not None:
         x = random.randint(sleep_time, to_sleep)
@@ -77,3 +98,14 @@ def sleep(sleep_time, to_sleep=None, label="Sleep until next account", new_line=
 
     if new_line:
         print()  # new line break
+
+
+async def async_sleep(sleep_time, to_sleep=None, label="Sleep until next account"):
+    """Non-blocking `sleep`, logs the pause once instead of drawing a progress bar per wallet"""
+    if to_sleep is not None:
+        x = random.randint(sleep_time, to_sleep)
+    else:
+        x = sleep_time
+
+    logger.info(f"{label} {x}s")
+    await asyncio.sleep(x)
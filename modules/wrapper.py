@@ -1,33 +1,42 @@
+from models.async_wallet import AsyncWallet
 from models.wallet import Wallet
 from modules.config import WBTC, logger
 
 
 class Wrapper(Wallet):
+    CONTRACT_ABI = [
+        {"type": "function", "name": "deposit", "inputs": []},
+        {
+            "type": "function",
+            "name": "withdraw",
+            "inputs": [{"name": "amount", "type": "uint256"}],
+        },
+    ]
+
     def __init__(self, private_key, counter):
         super().__init__(private_key, counter)
         self.label += "WBTC |"
-        contract_abi = [
-            {"type": "function", "name": "deposit", "inputs": []},
-            {
-                "type": "function",
-                "name": "withdraw",
-                "inputs": [{"name": "amount", "type": "uint256"}],
-            },
-        ]
-        self.contract = self.get_contract(WBTC, abi=contract_abi)
+        self.contract = self.get_contract(WBTC, abi=self.CONTRACT_ABI)
 
-    def deposit(self, amount):
+    def build_deposit(self, amount):
         amount_wei = self.web3.to_wei(amount, "ether")
 
-        contract_tx = self.contract.functions.deposit().build_transaction(
-            self.get_tx_data(value=amount_wei)
-        )
+        return self.build_tx(self.contract.functions.deposit(), value=amount_wei)
+
+    def deposit(self, amount):
+        contract_tx = self.build_deposit(amount)
 
         return self.send_tx(
             contract_tx,
-            tx_label=f"{self.label} wrap {amount:.8f} BTC [{self.tx_count}]",
+            tx_label=f"{self.label} wrap {amount:.8f} BTC [{contract_tx['nonce']}]",
         )
 
+    def batch_deposit(self, amounts):
+        """Wraps every amount with back-to-back txs and waits for their receipts together"""
+        txs = [(self.build_deposit(amount), f"{self.label} wrap {amount:.8f} BTC") for amount in amounts]
+
+        return self.send_txs(txs)
+
     def withdraw(self):
         balance, decimals, symbol = self.get_token(WBTC)
 
@@ -35,11 +44,49 @@ class Wrapper(Wallet):
             logger.warning(f"{self.label} no {symbol} balance to withdraw \n")
             return
 
-        contract_tx = self.contract.functions.withdraw(balance).build_transaction(
-            self.get_tx_data()
-        )
+        contract_tx = self.build_tx(self.contract.functions.withdraw(balance))
 
         return self.send_tx(
             contract_tx,
-            tx_label=f"{self.label} unwrap {balance / 10 ** decimals:.8f} {symbol} [{self.tx_count}]",
+            tx_label=f"{self.label} unwrap {balance / 10 ** decimals:.8f} {symbol} [{contract_tx['nonce']}]",
+        )
+
+
+class AsyncWrapper(AsyncWallet):
+    def __init__(self, private_key, counter):
+        super().__init__(private_key, counter)
+        self.label += "WBTC |"
+        self.contract = self.get_contract(WBTC, abi=Wrapper.CONTRACT_ABI)
+
+    async def build_deposit(self, amount):
+        amount_wei = self.web3.to_wei(amount, "ether")
+
+        return await self.build_tx(self.contract.functions.deposit(), value=amount_wei)
+
+    async def deposit(self, amount):
+        contract_tx = await self.build_deposit(amount)
+
+        return await self.send_tx(
+            contract_tx,
+            tx_label=f"{self.label} wrap {amount:.8f} BTC [{contract_tx['nonce']}]",
+        )
+
+    async def batch_deposit(self, amounts):
+        """Wraps every amount with back-to-back txs and waits for their receipts together"""
+        txs = [(await self.build_deposit(amount), f"{self.label} wrap {amount:.8f} BTC") for amount in amounts]
+
+        return await self.send_txs(txs)
+
+    async def withdraw(self):
+        balance, decimals, symbol = await self.get_token(WBTC)
+
+        if not balance:
+            logger.warning(f"{self.label} no {symbol} balance to withdraw \n")
+            return
+
+        contract_tx = await self.build_tx(self.contract.functions.withdraw(balance))
+
+        return await self.send_tx(
+            contract_tx,
+            tx_label=f"{self.label} unwrap {balance / 10 ** decimals:.8f} {symbol} [{contract_tx['nonce']}]",
         )
@@ -8,11 +8,82 @@ SHUFFLE_WALLETS = False
 USE_PROXY = True
 INFINITY_LOOP = False
 
+# INFINITY_LOOP: UTC hours [start, end) each wallet's daily run is spread over
+DAILY_WINDOW_UTC = [0, 6]
+
+# INFINITY_LOOP: max wallets planned to run in one hour, overflow moves to the next day, 0 = no limit
+WALLETS_PER_HOUR = 0
+
 RETRY_COUNT = 1
 
+# Number of wallets processed in parallel, 1 = one by one
+# See MAX_SESSIONS_PER_PROXY for how many of them may share a proxy
+MAX_CONCURRENT_WALLETS = 1
+
+# Run wallets as coroutines on a single event loop instead of threads
+ASYNC_MODE = False
+
+# Keep-alive connections per RPC endpoint, shared by all wallets
+RPC_POOL_SIZE = 20
+
+# Max requests merged into one JSON-RPC batch POST for bulk reads
+RPC_BATCH_SIZE = 100
+
+# Max contract reads aggregated into one Multicall3 eth_call
+MULTICALL_BATCH_SIZE = 500
+
+# Seconds between new-block checks of the shared receipt watcher
+BLOCK_POLL_INTERVAL = 2
+
+# Seconds fees from eth_feeHistory are reused before asking the RPC again
+FEE_CACHE_TTL = 5
+
+# Learned gas limits are the gasUsed of earlier txs times this margin
+GAS_LIMIT_MARGIN = 1.2
+
+# Seconds a saved Bitlayer login is reused when the site sets no cookie expiry
+SESSION_TTL = 12 * 60 * 60
+
+# Wallets allowed to run through one proxy at the same time
+MAX_SESSIONS_PER_PROXY = 1
+
+# Seconds between background proxy health checks, failing or slow proxies are skipped
+PROXY_CHECK_INTERVAL = 300
+
+# Seconds a proxy's exit IP is cached before httpbin is asked again
+EXIT_IP_TTL = 600
+
+# Seconds Bitlayer API reads are served from memory, any write to the API drops them
+API_CACHE_TTL = 30
+
+# Seconds near-static API data (airdrop allocations) is kept on disk
+API_DISK_CACHE_TTL = 24 * 60 * 60
+
+# Report rows are buffered and written to reports/*.csv and reports/reports.db
+# once this many are waiting, or every REPORT_FLUSH_INTERVAL seconds
+REPORT_FLUSH_ROWS = 100
+REPORT_FLUSH_INTERVAL = 10
+
+# Port of a local Prometheus /metrics endpoint (RPC, API and proxy stats), 0 = off
+METRICS_PORT = 0
+# Metrics are also written here when the run ends (node_exporter textfile format), "" = off
+METRICS_FILE = "reports/metrics.prom"
+
+# --coordinator / --worker: seconds a worker holds a wallet job without renewing it,
+# a job of a worker that stopped renewing is handed to another worker after this
+QUEUE_LEASE_TTL = 15 * 60
+# Runs of a job (failed or lease ran out) before it is given up
+QUEUE_MAX_ATTEMPTS = 3
+# Shared secret workers send to the coordinator, "" = none (the coordinator then only listens on loopback)
+QUEUE_TOKEN = ""
+
 SLEEP_BETWEEN_WALLETS = [10, 20]
 SLEEP_BETWEEN_ACTIONS = [10, 20]
 
+# Send multi-tx actions (e.g. WRAP BTC) back-to-back and wait for all receipts together
+# Skips SLEEP_BETWEEN_ACTIONS between those txs
+PIPELINE_TXS = False
+
 # If wallet balance falls under this value, the action will be skipped
 MIN_BTC_BALANCE = 0.000002  # $0.20
 